@@ -0,0 +1,108 @@
+import asyncio
+import json
+import logging
+from typing import Any, AsyncGenerator, Dict, List, Union
+
+from pydantic import ValidationError
+
+from app.models.resume_models import ResumeAnalysisRequest
+from app.workflow.resume_graph import (
+    resume_workflow, create_initial_state, generate_thread_id
+)
+from app.workflow.resume_stream import stream_coalesced_analysis
+
+logger = logging.getLogger(__name__)
+
+# Keys of the final state returned for each resume in a batch
+RESULT_KEYS = ("summary", "questions", "insights", "work_experiences", "education", "skills")
+
+def parse_batch_body(body: bytes, max_items: int) -> List[Union[ResumeAnalysisRequest, str]]:
+    """
+    Parse a JSON array or NDJSON body into analysis requests.
+
+    Items that fail validation are kept as error strings so their position
+    in the batch still gets a result line.
+    """
+    text = body.decode("utf-8").strip()
+    if not text:
+        raise ValueError("Request body is empty")
+
+    if text.startswith("["):
+        try:
+            raw_items = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON array: {str(e)}")
+    else:
+        raw_items = []
+        for line_number, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                raw_items.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raw_items.append(f"Invalid JSON on line {line_number}: {str(e)}")
+
+    if len(raw_items) > max_items:
+        raise ValueError(f"Batch contains {len(raw_items)} resumes; the limit is {max_items}")
+
+    items: List[Union[ResumeAnalysisRequest, str]] = []
+    for raw in raw_items:
+        if isinstance(raw, str):
+            items.append(raw)
+            continue
+        try:
+            items.append(ResumeAnalysisRequest(**raw))
+        except (TypeError, ValidationError) as e:
+            items.append(f"Invalid request: {str(e)}")
+    return items
+
+async def analyze_one(index: int, resume_text: str) -> Dict[str, Any]:
+    """Run one resume through the workflow and collect its final result"""
+    config = {"configurable": {"thread_id": generate_thread_id()}}
+    checkpoint_id = None
+
+    async for event in stream_coalesced_analysis(create_initial_state(resume_text), config):
+        if event.type == "error":
+            return {"index": index, "status": "error", "error": event.content}
+        if event.type == "complete":
+            checkpoint_id = event.checkpoint_id
+
+    if not checkpoint_id:
+        # The run stopped (its disconnect policy, a cancelled thread) before it completed
+        return {"index": index, "status": "error", "error": "Analysis ended before it completed"}
+
+    # Coalesced and cached analyses report the checkpoint of the thread that holds the result
+    snapshot = await resume_workflow.aget_state({"configurable": {"thread_id": checkpoint_id}})
+    return {
+        "index": index,
+        "status": "success",
+        "checkpoint_id": checkpoint_id,
+        **{key: snapshot.values.get(key) for key in RESULT_KEYS}
+    }
+
+async def run_batch(
+    items: List[Union[ResumeAnalysisRequest, str]],
+    concurrency: int
+) -> AsyncGenerator[Dict[str, Any], None]:
+    """Analyze a batch with at most `concurrency` workflows running, yielding results as they finish"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_item(index: int, item: Union[ResumeAnalysisRequest, str]) -> Dict[str, Any]:
+        if isinstance(item, str):
+            return {"index": index, "status": "error", "error": item}
+        async with semaphore:
+            try:
+                return await analyze_one(index, item.resume_text)
+            except Exception as e:
+                logger.error(f"Batch item {index} failed: {str(e)}")
+                return {"index": index, "status": "error", "error": f"Analysis failed: {str(e)}"}
+
+    tasks = [asyncio.create_task(run_item(i, item)) for i, item in enumerate(items)]
+    try:
+        for next_result in asyncio.as_completed(tasks):
+            yield await next_result
+    finally:
+        # A disconnected client should not leave the rest of the batch running
+        for task in tasks:
+            if not task.done():
+                task.cancel()
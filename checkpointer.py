@@ -0,0 +1,440 @@
+import asyncio
+import importlib
+import logging
+import time
+from typing import AsyncContextManager, Callable, Dict, List, Optional, Tuple
+
+import aiosqlite
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.aiosqlite import AsyncSqliteSaver
+from langgraph.checkpoint.base import BaseCheckpointSaver, Checkpoint, CheckpointMetadata
+from langgraph.checkpoint.memory import MemorySaver
+
+from app.utils.config import Config
+from app.utils.metrics import CHECKPOINT_BATCH_SIZE, CHECKPOINT_WRITE_DURATION, CHECKPOINTS_PURGED
+from app.utils.sqlite_helpers import immediate_transaction, process_owner
+
+logger = logging.getLogger(__name__)
+
+INSERT_CHECKPOINT = (
+    "INSERT OR REPLACE INTO checkpoints (thread_id, thread_ts, parent_ts, checkpoint, metadata) "
+    "VALUES (?, ?, ?, ?, ?)"
+)
+TOUCH_THREAD = "INSERT OR REPLACE INTO checkpoint_threads (thread_id, updated_at) VALUES (?, ?)"
+
+# Checkpoints that a newer checkpoint of the same thread has superseded
+SUPERSEDED_CHECKPOINTS = (
+    "SELECT c.rowid FROM checkpoints c WHERE c.thread_ts < "
+    "(SELECT MAX(m.thread_ts) FROM checkpoints m WHERE m.thread_id = c.thread_id) LIMIT ?"
+)
+
+# Take a named lease, or extend it if this owner already holds it; a lapsed lease can be taken over
+ACQUIRE_LEASE = (
+    "INSERT INTO checkpoint_leases (name, owner, expires_at) VALUES (?, ?, ?) "
+    "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+    "WHERE checkpoint_leases.owner = excluded.owner OR checkpoint_leases.expires_at < ?"
+)
+
+class BatchedAsyncSqliteSaver(AsyncSqliteSaver):
+    """
+    AsyncSqliteSaver with tuned pragmas and group commit.
+
+    Checkpoint writes from concurrent analyses are queued and committed
+    together in one transaction, so many writers share a single fsync
+    instead of each waiting for its own. Every aput still returns only
+    after its row is committed, so a read that follows a write sees it.
+
+    Retention: threads idle for longer than ttl_seconds are deleted, and
+    with keep_latest_only every thread keeps just its newest checkpoint.
+    Purges run in small batches and free pages are returned to the file
+    system with incremental vacuum. A database created before incremental
+    vacuum was enabled needs one full rebuild first, which blocks every
+    writer while it runs; it is an explicit maintenance step
+    (`python -m app.utils.checkpointer vacuum`), never done while serving.
+
+    Several worker processes on one host can share the database file.
+    SQLite serializes their commits. Writes use their own connection and
+    take the write lock up front (BEGIN IMMEDIATE): a transaction that
+    started as a read on a snapshot another process has since changed
+    fails at once, without waiting out busy_timeout. A lease lets only
+    one process run retention at a time.
+    """
+
+    def __init__(
+        self,
+        conn: aiosqlite.Connection,
+        *,
+        path: Optional[str] = None,
+        synchronous: str = "NORMAL",
+        busy_timeout_ms: int = 5000,
+        batch_size: int = 64,
+        batch_delay_ms: float = 0.0,
+        ttl_seconds: float = 0.0,
+        keep_latest_only: bool = False,
+        purge_batch_size: int = 500,
+        vacuum_pages: int = 1000,
+        **kwargs
+    ):
+        super().__init__(conn, **kwargs)
+        self.synchronous = synchronous
+        self.busy_timeout_ms = busy_timeout_ms
+        self.batch_size = batch_size
+        self.batch_delay_ms = batch_delay_ms
+        self.ttl_seconds = ttl_seconds
+        self.keep_latest_only = keep_latest_only
+        self.purge_batch_size = purge_batch_size
+        self.vacuum_pages = vacuum_pages
+        self.path = path
+        self.write_lock = asyncio.Lock()
+        self.write_conn: Optional[aiosqlite.Connection] = None
+        self._pending: List[Tuple[tuple, asyncio.Future]] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self.owner = process_owner()
+        self._vacuum_warned = False
+
+    @classmethod
+    def from_path(cls, path: str, **kwargs) -> "BatchedAsyncSqliteSaver":
+        # The connection is opened lazily by setup(), inside the running event loop
+        return cls(conn=aiosqlite.connect(path), path=path, **kwargs)
+
+    async def setup(self) -> None:
+        async with self.lock:
+            if self.is_setup:
+                return
+            if not self.conn.is_alive():
+                await self.conn
+            # Set first: other workers may be setting up the same file right now
+            await self.conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            # Only takes effect on a new database; existing ones are rebuilt by enable_incremental_vacuum()
+            await self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            # WAL lets readers proceed during writes; synchronous=NORMAL is
+            # crash-safe in WAL mode and skips an fsync per commit
+            await self.conn.executescript(
+                f"""
+                PRAGMA journal_mode=WAL;
+                PRAGMA synchronous={self.synchronous};
+                PRAGMA busy_timeout={int(self.busy_timeout_ms)};
+                PRAGMA temp_store=MEMORY;
+                PRAGMA cache_size=-20000;
+                PRAGMA journal_size_limit=67108864;
+                CREATE TABLE IF NOT EXISTS checkpoints (
+                    thread_id TEXT NOT NULL,
+                    thread_ts TEXT NOT NULL,
+                    parent_ts TEXT,
+                    checkpoint BLOB,
+                    metadata BLOB,
+                    PRIMARY KEY (thread_id, thread_ts)
+                );
+                CREATE TABLE IF NOT EXISTS checkpoint_threads (
+                    thread_id TEXT PRIMARY KEY,
+                    updated_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS checkpoint_threads_updated_at
+                    ON checkpoint_threads (updated_at);
+                CREATE TABLE IF NOT EXISTS checkpoint_leases (
+                    name TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                );
+                """
+            )
+            # Threads written before retention existed start their TTL now
+            await self.conn.execute(
+                "INSERT OR IGNORE INTO checkpoint_threads (thread_id, updated_at) "
+                "SELECT DISTINCT thread_id, ? FROM checkpoints",
+                (time.time(),)
+            )
+            await self.conn.commit()
+            if self.path:
+                # Autocommit: transactions are opened explicitly by _write_transaction
+                self.write_conn = await aiosqlite.connect(self.path, isolation_level=None)
+                await self.write_conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+                await self.write_conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            else:
+                self.write_conn = self.conn
+            self.is_setup = True
+
+    async def incremental_vacuum_enabled(self) -> bool:
+        await self.setup()
+        # The write connection is the one that rebuilds the database, so it sees the current mode
+        async with self.write_conn.execute("PRAGMA auto_vacuum") as cursor:
+            return (await cursor.fetchone())[0] == 2
+
+    async def enable_incremental_vacuum(self) -> None:
+        """
+        Maintenance: rebuild an existing database with auto_vacuum=INCREMENTAL.
+
+        The full VACUUM holds the write lock for as long as it takes to
+        copy the file, so run it while the API is stopped, after a purge
+        has shrunk the data it copies.
+        """
+        if await self.incremental_vacuum_enabled():
+            return
+        async with self.write_lock:
+            await self.write_conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            # The mode of an existing database only changes after a full VACUUM
+            logger.info("Rebuilding checkpoint database for incremental vacuum")
+            await self.write_conn.execute("VACUUM")
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+    ) -> RunnableConfig:
+        started = time.perf_counter()
+        await self.setup()
+        row = (
+            str(config["configurable"]["thread_id"]),
+            checkpoint["id"],
+            config["configurable"].get("thread_ts"),
+            self.serde.dumps(checkpoint),
+            self.serde.dumps(metadata),
+        )
+        written = asyncio.get_running_loop().create_future()
+        self._pending.append((row, written))
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush())
+
+        try:
+            await written
+        finally:
+            CHECKPOINT_WRITE_DURATION.observe(time.perf_counter() - started)
+
+        return {
+            "configurable": {
+                "thread_id": config["configurable"]["thread_id"],
+                "thread_ts": checkpoint["id"],
+            }
+        }
+
+    async def aclose(self) -> None:
+        """Commit any queued checkpoints and close the connection"""
+        if self._flusher is not None:
+            await self._flusher
+        if self.is_setup:
+            if self.write_conn is not self.conn:
+                await self.write_conn.close()
+            await self.conn.close()
+            self.is_setup = False
+
+    def _write_transaction(self) -> AsyncContextManager[aiosqlite.Connection]:
+        return immediate_transaction(self.write_conn, self.write_lock)
+
+    async def _flush(self) -> None:
+        """Commit queued checkpoints in batches until the queue is empty"""
+        if self.batch_delay_ms > 0:
+            # Give concurrent writers a moment to join this batch
+            await asyncio.sleep(self.batch_delay_ms / 1000.0)
+
+        # Writes queued while a batch is committing are picked up by the next one
+        while self._pending:
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+            now = time.time()
+            try:
+                async with self._write_transaction() as conn:
+                    await conn.executemany(INSERT_CHECKPOINT, [row for row, _ in batch])
+                    await conn.executemany(TOUCH_THREAD, {(row[0], now) for row, _ in batch})
+            except Exception as e:
+                logger.error(f"Checkpoint batch of {len(batch)} failed: {str(e)}")
+                for _, written in batch:
+                    if not written.done():
+                        written.set_exception(e)
+                continue
+
+            CHECKPOINT_BATCH_SIZE.observe(len(batch))
+            for _, written in batch:
+                if not written.done():
+                    written.set_result(None)
+
+    async def purge_expired(self) -> int:
+        """Delete threads idle for longer than the TTL, one small batch per transaction"""
+        if self.ttl_seconds <= 0:
+            return 0
+        await self.setup()
+        purged = 0
+        while True:
+            async with self._write_transaction() as conn:
+                async with conn.execute(
+                    "SELECT thread_id FROM checkpoint_threads WHERE updated_at < ? LIMIT ?",
+                    (time.time() - self.ttl_seconds, self.purge_batch_size)
+                ) as cursor:
+                    thread_ids = [(row[0],) for row in await cursor.fetchall()]
+                await conn.executemany("DELETE FROM checkpoints WHERE thread_id = ?", thread_ids)
+                await conn.executemany("DELETE FROM checkpoint_threads WHERE thread_id = ?", thread_ids)
+            if not thread_ids:
+                return purged
+            purged += len(thread_ids)
+            CHECKPOINTS_PURGED.labels(reason="expired").inc(len(thread_ids))
+            # Let queued checkpoint writes in between batches
+            await asyncio.sleep(0)
+
+    async def purge_superseded(self) -> int:
+        """Delete every checkpoint except the newest of its thread, one small batch at a time"""
+        if not self.keep_latest_only:
+            return 0
+        await self.setup()
+        purged = 0
+        while True:
+            async with self._write_transaction() as conn:
+                async with conn.execute(SUPERSEDED_CHECKPOINTS, (self.purge_batch_size,)) as cursor:
+                    rowids = [(row[0],) for row in await cursor.fetchall()]
+                await conn.executemany("DELETE FROM checkpoints WHERE rowid = ?", rowids)
+            if not rowids:
+                return purged
+            purged += len(rowids)
+            CHECKPOINTS_PURGED.labels(reason="superseded").inc(len(rowids))
+            await asyncio.sleep(0)
+
+    async def compact(self) -> None:
+        """Return up to vacuum_pages free pages to the file system"""
+        if not await self.incremental_vacuum_enabled():
+            if self._vacuum_warned:
+                return
+            self._vacuum_warned = True
+            logger.warning(
+                "Checkpoint database does not use incremental vacuum, so purged pages are not "
+                "returned to the file system; run `python -m app.utils.checkpointer vacuum` once"
+            )
+            return
+        async with self.write_lock:
+            # execute() steps the pragma once, freeing a single page; a script runs it to completion
+            await self.write_conn.executescript(f"PRAGMA incremental_vacuum({int(self.vacuum_pages)});")
+
+    async def acquire_lease(self, name: str, ttl_seconds: float) -> bool:
+        """Hold a named lease across every process sharing the database, renewing it if already held"""
+        await self.setup()
+        now = time.time()
+        async with self._write_transaction() as conn:
+            await conn.execute(ACQUIRE_LEASE, (name, self.owner, now + ttl_seconds, now))
+            async with conn.execute("SELECT owner FROM checkpoint_leases WHERE name = ?", (name,)) as cursor:
+                row = await cursor.fetchone()
+        return row is not None and row[0] == self.owner
+
+    async def release_lease(self, name: str) -> None:
+        """Give up a lease this process holds, so another worker can take it at once"""
+        await self.setup()
+        async with self._write_transaction() as conn:
+            await conn.execute("DELETE FROM checkpoint_leases WHERE name = ? AND owner = ?", (name, self.owner))
+
+    async def purge_lapsed_leases(self) -> int:
+        """Delete leases whose holder stopped renewing them"""
+        await self.setup()
+        async with self._write_transaction() as conn:
+            cursor = await conn.execute("DELETE FROM checkpoint_leases WHERE expires_at < ?", (time.time(),))
+            return cursor.rowcount
+
+    async def run_retention(self, interval_seconds: float) -> None:
+        """Background loop: purge and compact every interval until cancelled"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                # One worker purges; the lease outlives a missed interval so it does not flap
+                if not await self.acquire_lease("retention", interval_seconds * 2):
+                    continue
+                expired = await self.purge_expired()
+                superseded = await self.purge_superseded()
+                await self.purge_lapsed_leases()
+                if expired or superseded:
+                    logger.info(
+                        f"Checkpoint retention removed {expired} expired threads "
+                        f"and {superseded} superseded checkpoints"
+                    )
+                await self.compact()
+            except Exception as e:
+                logger.error(f"Checkpoint retention failed: {str(e)}")
+
+class InMemoryCheckpointSaver(MemorySaver):
+    """
+    Process-local stand-in for the checkpoint store, for tests and
+    single-process development. Checkpoints are lost on restart and are
+    not visible to other workers.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.owner = process_owner()
+        self.leases: Dict[str, Tuple[str, float]] = {}
+
+    async def acquire_lease(self, name: str, ttl_seconds: float) -> bool:
+        now = time.time()
+        owner, expires_at = self.leases.get(name, (self.owner, now))
+        if owner != self.owner and expires_at >= now:
+            return False
+        self.leases[name] = (self.owner, now + ttl_seconds)
+        return True
+
+    async def release_lease(self, name: str) -> None:
+        if self.leases.get(name, (None, 0.0))[0] == self.owner:
+            del self.leases[name]
+
+    async def aclose(self) -> None:
+        return None
+
+    async def run_retention(self, interval_seconds: float) -> None:
+        return None
+
+def _sqlite_checkpointer() -> BatchedAsyncSqliteSaver:
+    return BatchedAsyncSqliteSaver.from_path(
+        Config.CHECKPOINT_DB_PATH,
+        synchronous=Config.CHECKPOINT_SYNCHRONOUS,
+        busy_timeout_ms=Config.CHECKPOINT_BUSY_TIMEOUT_MS,
+        batch_size=Config.CHECKPOINT_BATCH_SIZE,
+        batch_delay_ms=Config.CHECKPOINT_BATCH_DELAY_MS,
+        ttl_seconds=Config.CHECKPOINT_TTL_SECONDS,
+        keep_latest_only=Config.CHECKPOINT_KEEP_LATEST_ONLY,
+        purge_batch_size=Config.CHECKPOINT_PURGE_BATCH_SIZE,
+        vacuum_pages=Config.CHECKPOINT_VACUUM_PAGES
+    )
+
+# Backend name -> factory; CHECKPOINT_BACKEND may also name one as "package.module:factory"
+CHECKPOINT_BACKENDS: Dict[str, Callable[[], BaseCheckpointSaver]] = {
+    "sqlite": _sqlite_checkpointer,
+    "memory": InMemoryCheckpointSaver,
+}
+
+def register_checkpoint_backend(name: str, factory: Callable[[], BaseCheckpointSaver]) -> None:
+    CHECKPOINT_BACKENDS[name] = factory
+
+def get_checkpointer() -> BaseCheckpointSaver:
+    """
+    Checkpoint saver configured from the environment.
+
+    Savers from other backends (a database shared by several hosts, for
+    example) should provide aclose() and run_retention(interval) like the
+    SQLite saver; the API calls them on shutdown and startup. They should
+    also provide acquire_lease(name, ttl) and release_lease(name), which
+    decide the one worker that runs each analysis thread.
+    """
+    backend = Config.CHECKPOINT_BACKEND
+    if backend in CHECKPOINT_BACKENDS:
+        return CHECKPOINT_BACKENDS[backend]()
+    module_name, _, factory_name = backend.partition(":")
+    if not factory_name:
+        raise ValueError(f"Unknown checkpoint backend: {backend}")
+    return getattr(importlib.import_module(module_name), factory_name)()
+
+async def _maintenance_vacuum() -> None:
+    """Purge, then rebuild the SQLite checkpoint database for incremental vacuum"""
+    saver = _sqlite_checkpointer()
+    try:
+        expired = await saver.purge_expired()
+        superseded = await saver.purge_superseded()
+        logger.info(f"Purged {expired} expired threads and {superseded} superseded checkpoints")
+        await saver.enable_incremental_vacuum()
+        await saver.compact()
+    finally:
+        await saver.aclose()
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Checkpoint database maintenance")
+    parser.add_argument(
+        "command", choices=["vacuum"],
+        help="vacuum: purge, then enable incremental vacuum (one full rebuild; stop the API first)"
+    )
+    parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_maintenance_vacuum())
@@ -1,7 +1,14 @@
 import os
+from typing import Dict, Optional, Tuple
+
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
 
+from app.utils.fake_llm import FakeResumeChatModel
+from app.utils.rate_limiter import LLMRateLimiter, RateLimitedChatModel
+
 load_dotenv()
 
 class Config:
@@ -10,14 +17,184 @@ class Config:
     TEMPERATURE = 0.1
     MAX_TOKENS = 2000
     
+    # "openai" for the real model, "fake" for the deterministic offline model (tests, load runs)
+    LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+    FAKE_LLM_LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "500"))
+    FAKE_LLM_JITTER_MS = float(os.getenv("FAKE_LLM_JITTER_MS", "150"))
+    FAKE_LLM_DISTRIBUTION = os.getenv("FAKE_LLM_DISTRIBUTION", "normal")  # fixed, uniform, normal, lognormal
+    FAKE_LLM_TOKEN_DELAY_MS = float(os.getenv("FAKE_LLM_TOKEN_DELAY_MS", "5"))
+    FAKE_LLM_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+    
+    # "separate": one LLM call per extractor, run in parallel
+    # "combined": a single call extracts work experience, education and skills
+    EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "separate")
+    
+    # Rule-based parsing of well-formatted sections; the LLM only sees sections
+    # the parser is less confident about than FAST_PATH_MIN_CONFIDENCE (0-1)
+    FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+    FAST_PATH_MIN_CONFIDENCE = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.8"))
+    
+    # Repair calls per invalid fragment (one entry, or a whole answer) of a structured output
+    STRUCTURED_REPAIR_ATTEMPTS = int(os.getenv("STRUCTURED_REPAIR_ATTEMPTS", "1"))
+    
+    # Routed text longer than this many tokens is extracted in chunks, in parallel (0 disables chunking)
+    EXTRACTION_CHUNK_TOKENS = int(os.getenv("EXTRACTION_CHUNK_TOKENS", "1500"))
+    
+    # Tokens of routed resume text (contact, profile, experience, skills) given to the summary
+    SUMMARY_CONTEXT_TOKENS = int(os.getenv("SUMMARY_CONTEXT_TOKENS", "750"))
+    
+    # Generate a first interview question from the extracted data alongside the summary, so it
+    # streams after one model call instead of after summary, insights and the full question set
+    FIRST_QUESTION_FAST_PATH = os.getenv("FIRST_QUESTION_FAST_PATH", "true").lower() == "true"
+    
+    # Connection pool shared by every LLM call in the process
+    LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+    LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+    LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))
+    
+    # Client-side rate limiting shared by every model call (0 disables a bucket)
+    LLM_RATE_LIMIT_ENABLED = os.getenv("LLM_RATE_LIMIT_ENABLED", "true").lower() == "true"
+    LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "3500"))
+    LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "160000"))
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))  # ceiling of the adaptive limit
+    LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+    LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+    LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+    LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "30"))
+    LLM_COMPLETION_TOKEN_ESTIMATE = int(os.getenv("LLM_COMPLETION_TOKEN_ESTIMATE", "500"))
+    
+    # Deployment: uvicorn worker processes, and for several hosts this node's ID and its peers'
+    # base URLs ("node-a=http://10.0.0.1:8000,node-b=...") so checkpoint requests reach their owner
+    MAX_WORKERS = int(os.getenv("MAX_WORKERS", "1"))
+    NODE_ID = os.getenv("NODE_ID", "")
+    NODE_URLS = os.getenv("NODE_URLS", "")
+    
+    # Analysis result cache: in-memory LRU backed by a SQLite file (empty path disables it)
+    RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+    RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1000"))
+    RESULT_CACHE_TTL_SECONDS = float(os.getenv("RESULT_CACHE_TTL_SECONDS", "86400"))
+    RESULT_CACHE_DB_PATH = os.getenv("RESULT_CACHE_DB_PATH", "result_cache.db")
+    
+    # Attach concurrent requests for the same resume to one running analysis
+    SINGLE_FLIGHT_ENABLED = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+    
+    # Event streams: seconds between heartbeats on an idle stream; a reconnect (Last-Event-ID) to a run
+    # not live in this process follows its checkpoints, and continues it once its worker's lease lapses
+    STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+    STREAM_POLL_INTERVAL_SECONDS = float(os.getenv("STREAM_POLL_INTERVAL_SECONDS", "1"))
+    # A running analysis renews its lease every third of this; a worker that stops renewing loses the run
+    STREAM_LEASE_SECONDS = float(os.getenv("STREAM_LEASE_SECONDS", "30"))
+    # When every client of a running analysis disconnects: "cancel" it and its model calls at once,
+    # stop at the next "checkpoint" (the step in progress finishes and is saved), or "continue" to the end
+    STREAM_DISCONNECT_POLICY = os.getenv("STREAM_DISCONNECT_POLICY", "checkpoint")
+    
+    # Bulk /analyze-resumes: workflows run at once per batch, and resumes accepted per batch
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+    BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "5000"))
+    
+    # Asynchronous /jobs: queue file shared by the workers of a host, analyses run at once per
+    # worker process, and seconds without a heartbeat before another worker takes a job over
+    JOB_QUEUE_DB_PATH = os.getenv("JOB_QUEUE_DB_PATH", "jobs.db")
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+    JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "10000"))
+    JOB_TTL_SECONDS = float(os.getenv("JOB_TTL_SECONDS", "604800"))
+    
+    # Checkpoint database: WAL journal, concurrent writes grouped into one commit
+    # "sqlite" (shared by the workers of one host), "memory" (process-local, for tests)
+    # or "package.module:factory" for another saver
+    CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite")
+    CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", "checkpoints.db")
+    CHECKPOINT_SYNCHRONOUS = os.getenv("CHECKPOINT_SYNCHRONOUS", "NORMAL")  # OFF, NORMAL, FULL
+    CHECKPOINT_BUSY_TIMEOUT_MS = int(os.getenv("CHECKPOINT_BUSY_TIMEOUT_MS", "5000"))
+    CHECKPOINT_BATCH_SIZE = int(os.getenv("CHECKPOINT_BATCH_SIZE", "64"))
+    CHECKPOINT_BATCH_DELAY_MS = float(os.getenv("CHECKPOINT_BATCH_DELAY_MS", "0"))
+    
+    # Checkpoint retention: idle threads expire after the TTL (0 keeps them forever);
+    # keep-latest drops every checkpoint but the newest of each thread
+    CHECKPOINT_TTL_SECONDS = float(os.getenv("CHECKPOINT_TTL_SECONDS", "604800"))
+    CHECKPOINT_KEEP_LATEST_ONLY = os.getenv("CHECKPOINT_KEEP_LATEST_ONLY", "false").lower() == "true"
+    CHECKPOINT_PURGE_INTERVAL_SECONDS = float(os.getenv("CHECKPOINT_PURGE_INTERVAL_SECONDS", "300"))
+    CHECKPOINT_PURGE_BATCH_SIZE = int(os.getenv("CHECKPOINT_PURGE_BATCH_SIZE", "500"))
+    CHECKPOINT_VACUUM_PAGES = int(os.getenv("CHECKPOINT_VACUUM_PAGES", "1000"))
+    
+    # Process-wide registry: one client (and HTTP pool) per model configuration
+    _llm_registry: Dict[Tuple[str, str, float, int], BaseChatModel] = {}
+    _rate_limiter: Optional[LLMRateLimiter] = None
+    
+    @classmethod
+    def get_rate_limiter(cls) -> LLMRateLimiter:
+        """
+        Process-wide limiter: every model shares the provider's budget.
+        
+        The budgets are for the whole host, so each of MAX_WORKERS
+        processes gets an equal share.
+        """
+        if cls._rate_limiter is None:
+            workers = max(1, cls.MAX_WORKERS)
+            cls._rate_limiter = LLMRateLimiter(
+                requests_per_minute=cls.LLM_REQUESTS_PER_MINUTE / workers,
+                tokens_per_minute=cls.LLM_TOKENS_PER_MINUTE / workers,
+                max_concurrency=max(cls.LLM_MIN_CONCURRENCY, cls.LLM_MAX_CONCURRENCY // workers),
+                min_concurrency=cls.LLM_MIN_CONCURRENCY,
+                max_retries=cls.LLM_MAX_RETRIES,
+                base_delay=cls.LLM_RETRY_BASE_DELAY,
+                max_delay=cls.LLM_RETRY_MAX_DELAY
+            )
+        return cls._rate_limiter
+    
+    @classmethod
+    def _rate_limited(cls, llm: BaseChatModel) -> BaseChatModel:
+        if not cls.LLM_RATE_LIMIT_ENABLED:
+            return llm
+        return RateLimitedChatModel(
+            model=llm,
+            limiter=cls.get_rate_limiter(),
+            completion_token_estimate=cls.LLM_COMPLETION_TOKEN_ESTIMATE
+        )
+    
     @classmethod
     def get_llm(cls):
+        if cls.LLM_BACKEND == "fake":
+            key = ("fake", cls.MODEL_NAME, cls.TEMPERATURE, cls.MAX_TOKENS)
+            if key not in cls._llm_registry:
+                cls._llm_registry[key] = cls._rate_limited(FakeResumeChatModel(
+                    latency_ms=cls.FAKE_LLM_LATENCY_MS,
+                    jitter_ms=cls.FAKE_LLM_JITTER_MS,
+                    distribution=cls.FAKE_LLM_DISTRIBUTION,
+                    token_delay_ms=cls.FAKE_LLM_TOKEN_DELAY_MS,
+                    seed=cls.FAKE_LLM_SEED,
+                    stream_usage=True
+                ))
+            return cls._llm_registry[key]
+        
         if not cls.OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY environment variable is required")
         
-        return ChatOpenAI(
-            model=cls.MODEL_NAME,
-            temperature=cls.TEMPERATURE,
-            max_tokens=cls.MAX_TOKENS,
-            openai_api_key=cls.OPENAI_API_KEY
-        )
\ No newline at end of file
+        key = ("openai", cls.MODEL_NAME, cls.TEMPERATURE, cls.MAX_TOKENS)
+        llm = cls._llm_registry.get(key)
+        if llm is None:
+            limits = httpx.Limits(
+                max_connections=cls.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=cls.LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=cls.LLM_KEEPALIVE_EXPIRY
+            )
+            llm = ChatOpenAI(
+                model=cls.MODEL_NAME,
+                temperature=cls.TEMPERATURE,
+                max_tokens=cls.MAX_TOKENS,
+                openai_api_key=cls.OPENAI_API_KEY,
+                # Streamed calls (the summary) report token usage for metrics and the rate limiter
+                stream_usage=True,
+                http_client=httpx.Client(limits=limits, timeout=cls.LLM_REQUEST_TIMEOUT),
+                http_async_client=httpx.AsyncClient(limits=limits, timeout=cls.LLM_REQUEST_TIMEOUT),
+                # The rate limiter retries with backoff; the SDK retrying as well would double up
+                max_retries=0 if cls.LLM_RATE_LIMIT_ENABLED else 2
+            )
+            llm = cls._rate_limited(llm)
+            cls._llm_registry[key] = llm
+        
+        return llm
@@ -0,0 +1,23 @@
+"""
+Offline test configuration: the fake model and in-memory checkpoints, so
+the suite runs in CI without an OpenAI key or database files.
+
+Settings are read when app.utils.config is imported, so they are set here
+before any test module imports the app.
+"""
+import os
+import tempfile
+
+_data_dir = tempfile.mkdtemp(prefix="resume-tests-")
+
+os.environ.update({
+    "LLM_BACKEND": "fake",
+    "FAKE_LLM_LATENCY_MS": "5",
+    "FAKE_LLM_JITTER_MS": "0",
+    "FAKE_LLM_TOKEN_DELAY_MS": "0",
+    "CHECKPOINT_BACKEND": "memory",
+    "RESULT_CACHE_ENABLED": "false",
+    "RESULT_CACHE_DB_PATH": "",
+    "JOB_QUEUE_DB_PATH": os.path.join(_data_dir, "jobs.db"),
+    "JOB_WORKERS": "1",
+})
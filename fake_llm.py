@@ -0,0 +1,242 @@
+import asyncio
+import hashlib
+import json
+import random
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import LanguageModelInput
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+ROLES = ["Software Engineer", "Senior Software Engineer", "Product Manager", "Data Analyst", "Marketing Manager"]
+COMPANIES = ["TechCorp Inc.", "StartupXYZ", "DevStudio", "GrowthCo", "BrandBuilders"]
+DEGREES = [("Bachelor of Science", "Computer Science"), ("Master of Business Administration", "Marketing"),
+           ("Bachelor of Arts", "Communications")]
+INSTITUTIONS = ["University of Technology", "Business School", "State University"]
+SKILLS = ["Python", "JavaScript", "SQL", "Docker", "Kubernetes", "AWS", "Leadership", "Communication"]
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+def _prompt_text(messages: List[BaseMessage]) -> str:
+    return "\n".join(str(message.content) for message in messages)
+
+class FakeResumeChatModel(BaseChatModel):
+    """
+    Deterministic offline chat model for tests and load generation.
+
+    A call with bound tools answers with a tool call whose arguments are
+    chosen from the tool's schema; other calls answer with summary text.
+    Both are seeded by the prompt text, so the same prompt always gets the
+    same schema-valid answer. Latency is drawn from a configurable
+    distribution to mimic a remote model.
+    """
+
+    latency_ms: float = 500.0
+    jitter_ms: float = 150.0
+    distribution: str = "normal"  # fixed, uniform, normal or lognormal
+    token_delay_ms: float = 5.0
+    seed: int = 0
+    # Like ChatOpenAI, streamed calls only report usage when asked to
+    stream_usage: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-resume-chat"
+
+    def _rng(self, prompt: str) -> random.Random:
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode("utf-8")).hexdigest()
+        return random.Random(int(digest[:16], 16))
+
+    def _sample_latency(self) -> float:
+        """Seconds to wait before answering; jitter is not seeded by the prompt"""
+        mean, jitter = self.latency_ms, self.jitter_ms
+        if self.distribution == "uniform":
+            value = random.uniform(mean - jitter, mean + jitter)
+        elif self.distribution == "normal":
+            value = random.gauss(mean, jitter)
+        elif self.distribution == "lognormal":
+            # Heavy right tail, parameterised so the median is `mean`
+            value = random.lognormvariate(0, jitter / mean if mean else 0) * mean
+        else:
+            value = mean
+        return max(0.0, value) / 1000.0
+
+    def bind_tools(
+        self,
+        tools: Sequence[Any],
+        *,
+        tool_choice: Optional[Any] = None,
+        **kwargs: Any
+    ) -> Runnable[LanguageModelInput, BaseMessage]:
+        formatted = [convert_to_openai_tool(tool) for tool in tools]
+        if isinstance(tool_choice, str) and tool_choice not in ("auto", "none", "required", "any"):
+            # Same shape as ChatOpenAI: a tool name forces a call to that tool
+            tool_choice = {"type": "function", "function": {"name": tool_choice}}
+        return self.bind(tools=formatted, tool_choice=tool_choice, **kwargs)
+
+    def _tool_call(self, prompt: str, tool: Dict[str, Any]) -> Dict[str, Any]:
+        rng = self._rng(prompt)
+        name = tool["function"]["name"]
+        fields = set(tool["function"]["parameters"].get("properties", {}))
+        args: Dict[str, Any] = {}
+        if "work_experiences" in fields:
+            args["work_experiences"] = self._work_experiences(rng)
+        if "education" in fields:
+            args["education"] = self._education(rng)
+        if "skills" in fields:
+            args["skills"] = rng.sample(SKILLS, 4)
+        if "questions" in fields:
+            args["questions"] = [
+                f"Tell me about a time you used {skill} to solve a difficult problem."
+                for skill in rng.sample(SKILLS, 5)
+            ]
+        if "question" in fields:
+            args["question"] = f"Walk me through a project where you relied on {rng.choice(SKILLS)}."
+        if "insights" in fields:
+            args["insights"] = [
+                f"{rng.randint(2, 10)}+ years of experience as a {rng.choice(ROLES)}",
+                f"Strong background in {rng.choice(SKILLS)} and {rng.choice(SKILLS)}",
+                "Progressed to roles with increasing responsibility",
+                f"Led a team of {rng.randint(3, 12)} people"
+            ]
+        # Single entries are asked for when one entry of a list is repaired
+        if "company" in fields:
+            args = self._work_experiences(rng)[0]
+        elif "institution" in fields:
+            args = self._education(rng)[0]
+        call_id = hashlib.sha256(f"{name}:{prompt}".encode("utf-8")).hexdigest()[:24]
+        return {"name": name, "args": args, "id": f"call_{call_id}"}
+
+    def _respond(self, prompt: str) -> str:
+        return self._summary(self._rng(prompt))
+
+    def _work_experiences(self, rng: random.Random) -> List[Dict[str, Any]]:
+        experiences = []
+        year = 2024
+        for _ in range(rng.randint(1, 3)):
+            start = year - rng.randint(1, 4)
+            experiences.append({
+                "company": rng.choice(COMPANIES),
+                "role": rng.choice(ROLES),
+                "start_date": f"{start}-{rng.randint(1, 12):02d}",
+                "end_date": "Present" if year == 2024 else f"{year}-{rng.randint(1, 12):02d}",
+                "description": f"Delivered projects using {rng.choice(SKILLS)} and {rng.choice(SKILLS)}."
+            })
+            year = start
+        return experiences
+
+    def _education(self, rng: random.Random) -> List[Dict[str, Any]]:
+        degree, field = rng.choice(DEGREES)
+        start = rng.randint(2005, 2016)
+        return [{
+            "institution": rng.choice(INSTITUTIONS),
+            "degree": degree,
+            "field": field,
+            "start_year": start,
+            "end_year": start + 4
+        }]
+
+    def _summary(self, rng: random.Random) -> str:
+        return (
+            f"Experienced {rng.choice(ROLES)} with a track record at {rng.choice(COMPANIES)}. "
+            f"Skilled in {rng.choice(SKILLS)}, {rng.choice(SKILLS)} and {rng.choice(SKILLS)}, "
+            "with a focus on delivering measurable results.\n\n"
+            "Known for mentoring colleagues, collaborating across teams and steadily "
+            "taking on broader responsibility."
+        )
+
+    @staticmethod
+    def _usage(prompt: str, content: str) -> Dict[str, int]:
+        input_tokens, output_tokens = _approx_tokens(prompt), _approx_tokens(content)
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens
+        }
+
+    def _message(self, prompt: str, tools: Optional[List[Dict[str, Any]]] = None) -> AIMessage:
+        if tools:
+            call = self._tool_call(prompt, tools[0])
+            return AIMessage(content="", tool_calls=[call], usage_metadata=self._usage(prompt, json.dumps(call["args"])))
+        content = self._respond(prompt)
+        return AIMessage(content=content, usage_metadata=self._usage(prompt, content))
+
+    def _chunk(self, prompt: str, content: str, token: str, last: bool, stream_usage: bool) -> AIMessageChunk:
+        # Like OpenAI's stream usage, the totals arrive with the final chunk
+        if last and stream_usage:
+            return AIMessageChunk(content=token, usage_metadata=self._usage(prompt, content))
+        return AIMessageChunk(content=token)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        prompt = _prompt_text(messages)
+        time.sleep(self._sample_latency())
+        return ChatResult(generations=[ChatGeneration(message=self._message(prompt, kwargs.get("tools")))])
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        prompt = _prompt_text(messages)
+        await asyncio.sleep(self._sample_latency())
+        return ChatResult(generations=[ChatGeneration(message=self._message(prompt, kwargs.get("tools")))])
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        prompt = _prompt_text(messages)
+        time.sleep(self._sample_latency())
+        content = self._respond(prompt)
+        tokens = self._tokens(content)
+        for i, token in enumerate(tokens):
+            time.sleep(self.token_delay_ms / 1000.0)
+            chunk = ChatGenerationChunk(message=self._chunk(
+                prompt, content, token, i == len(tokens) - 1, kwargs.get("stream_usage", self.stream_usage)
+            ))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        prompt = _prompt_text(messages)
+        # Time to first token, then a steady token rate
+        await asyncio.sleep(self._sample_latency())
+        content = self._respond(prompt)
+        tokens = self._tokens(content)
+        for i, token in enumerate(tokens):
+            await asyncio.sleep(self.token_delay_ms / 1000.0)
+            chunk = ChatGenerationChunk(message=self._chunk(
+                prompt, content, token, i == len(tokens) - 1, kwargs.get("stream_usage", self.stream_usage)
+            ))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        words = text.split(" ")
+        return [word + (" " if i < len(words) - 1 else "") for i, word in enumerate(words)]
@@ -0,0 +1,380 @@
+import asyncio
+import json
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List, Optional
+
+import aiosqlite
+
+from app.models.resume_models import StreamResponse
+from app.utils.config import Config
+from app.utils.metrics import JOB_QUEUE_WAIT, JOBS_FINISHED
+from app.utils.sqlite_helpers import immediate_transaction, process_owner
+from app.workflow.batch_analysis import RESULT_KEYS
+from app.workflow.resume_graph import resume_workflow, create_initial_state
+from app.workflow.resume_stream import stream_resume_analysis
+
+logger = logging.getLogger(__name__)
+
+JOB_COLUMNS = (
+    "job_id", "status", "resume_text", "result", "error", "attempts",
+    "owner", "created_at", "started_at", "heartbeat_at", "finished_at"
+)
+
+class JobStore:
+    """
+    Persistent analysis queue: one row per job in a SQLite table shared
+    by every worker process of the host.
+
+    A worker claims the oldest queued job and keeps its heartbeat fresh
+    while the analysis runs. A job whose heartbeat is older than
+    stale_seconds (its worker crashed or the host restarted) is queued
+    again, up to max_attempts runs. Every update of a running job checks
+    the owner, so a worker that lost its job cannot overwrite it.
+    """
+
+    def __init__(self, path: str, *, busy_timeout_ms: int = 5000, stale_seconds: float = 60.0, max_attempts: int = 3):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.stale_seconds = stale_seconds
+        self.max_attempts = max_attempts
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+
+    async def _connection(self) -> aiosqlite.Connection:
+        async with self._lock:
+            if self._conn is None:
+                # Autocommit: every write is an explicit BEGIN IMMEDIATE transaction (see _transaction)
+                conn = await aiosqlite.connect(self.path, isolation_level=None)
+                await conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+                await conn.executescript(
+                    """
+                    PRAGMA journal_mode=WAL;
+                    PRAGMA synchronous=NORMAL;
+                    CREATE TABLE IF NOT EXISTS analysis_jobs (
+                        job_id TEXT PRIMARY KEY,
+                        status TEXT NOT NULL,
+                        resume_text TEXT NOT NULL,
+                        result TEXT,
+                        error TEXT,
+                        attempts INTEGER NOT NULL DEFAULT 0,
+                        owner TEXT,
+                        created_at REAL NOT NULL,
+                        started_at REAL,
+                        heartbeat_at REAL,
+                        finished_at REAL
+                    );
+                    CREATE INDEX IF NOT EXISTS analysis_jobs_status_created_at
+                        ON analysis_jobs (status, created_at);
+                    """
+                )
+                self._conn = conn
+            return self._conn
+
+    @asynccontextmanager
+    async def _transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        async with immediate_transaction(await self._connection(), self._write_lock) as conn:
+            yield conn
+
+    @staticmethod
+    def _job(row: Optional[tuple]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(zip(JOB_COLUMNS, row))
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    async def submit(self, job_id: str, resume_text: str) -> Dict[str, Any]:
+        async with self._transaction() as conn:
+            await conn.execute(
+                "INSERT INTO analysis_jobs (job_id, status, resume_text, created_at) VALUES (?, 'queued', ?, ?)",
+                (job_id, resume_text, time.time())
+            )
+        return await self.get(job_id)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        conn = await self._connection()
+        async with conn.execute(
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM analysis_jobs WHERE job_id = ?", (job_id,)
+        ) as cursor:
+            return self._job(await cursor.fetchone())
+
+    async def count_queued(self) -> int:
+        conn = await self._connection()
+        async with conn.execute("SELECT count(*) FROM analysis_jobs WHERE status = 'queued'") as cursor:
+            return (await cursor.fetchone())[0]
+
+    async def _requeue_stale(self, conn: aiosqlite.Connection, now: float) -> None:
+        """Take back running jobs whose worker stopped sending heartbeats"""
+        stale_before = now - self.stale_seconds
+        await conn.execute(
+            "UPDATE analysis_jobs SET status = 'failed', owner = NULL, finished_at = ?, "
+            "error = 'Analysis was interrupted ' || attempts || ' times' "
+            "WHERE status = 'running' AND heartbeat_at < ? AND attempts >= ?",
+            (now, stale_before, self.max_attempts)
+        )
+        cursor = await conn.execute(
+            "UPDATE analysis_jobs SET status = 'queued', owner = NULL "
+            "WHERE status = 'running' AND heartbeat_at < ?",
+            (stale_before,)
+        )
+        if cursor.rowcount > 0:
+            logger.warning(f"Requeued {cursor.rowcount} analysis jobs with stale heartbeats")
+            JOBS_FINISHED.labels(outcome="requeued").inc(cursor.rowcount)
+
+    async def claim(self, owner: str) -> Optional[Dict[str, Any]]:
+        """Mark the oldest queued job as running for `owner` and return it, or None if the queue is empty"""
+        now = time.time()
+        async with self._transaction() as conn:
+            await self._requeue_stale(conn, now)
+            async with conn.execute(
+                "UPDATE analysis_jobs SET status = 'running', owner = ?, attempts = attempts + 1, "
+                "started_at = coalesce(started_at, ?), heartbeat_at = ? "
+                "WHERE job_id = (SELECT job_id FROM analysis_jobs WHERE status = 'queued' "
+                "ORDER BY created_at LIMIT 1) "
+                f"RETURNING {', '.join(JOB_COLUMNS)}",
+                (owner, now, now)
+            ) as cursor:
+                return self._job(await cursor.fetchone())
+
+    async def heartbeat(self, job_id: str, owner: str) -> bool:
+        """Refresh a running job's heartbeat; False if the job is no longer held by `owner`"""
+        async with self._transaction() as conn:
+            cursor = await conn.execute(
+                "UPDATE analysis_jobs SET heartbeat_at = ? WHERE job_id = ? AND owner = ? AND status = 'running'",
+                (time.time(), job_id, owner)
+            )
+        return cursor.rowcount > 0
+
+    async def finish(
+        self,
+        job_id: str,
+        owner: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> bool:
+        status = "failed" if error else "succeeded"
+        async with self._transaction() as conn:
+            cursor = await conn.execute(
+                "UPDATE analysis_jobs SET status = ?, result = ?, error = ?, owner = NULL, finished_at = ? "
+                "WHERE job_id = ? AND owner = ? AND status = 'running'",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id, owner)
+            )
+        return cursor.rowcount > 0
+
+    async def release(self, owner: str) -> int:
+        """Queue the running jobs of `owner` again, e.g. on shutdown; they resume from their checkpoints"""
+        async with self._transaction() as conn:
+            cursor = await conn.execute(
+                "UPDATE analysis_jobs SET status = 'queued', owner = NULL, attempts = max(attempts - 1, 0) "
+                "WHERE owner = ? AND status = 'running'",
+                (owner,)
+            )
+        return cursor.rowcount
+
+    async def purge_finished(self, ttl_seconds: float) -> int:
+        """Delete finished jobs older than the TTL"""
+        if ttl_seconds <= 0:
+            return 0
+        async with self._transaction() as conn:
+            cursor = await conn.execute(
+                "DELETE FROM analysis_jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?",
+                (time.time() - ttl_seconds,)
+            )
+        return cursor.rowcount
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._conn is not None:
+                await self._conn.close()
+                self._conn = None
+
+async def job_progress(job_id: str) -> Dict[str, Any]:
+    """Progress of a job read from its checkpoints: the last node that finished and the ones to run next"""
+    snapshot = await resume_workflow.aget_state({"configurable": {"thread_id": job_id}})
+    return {
+        "node": snapshot.values.get("current_node") if snapshot.values else None,
+        "next": list(snapshot.next or ())
+    }
+
+async def run_analysis_job(job_id: str, resume_text: str) -> Dict[str, Any]:
+    """
+    Run one job's analysis on the thread named by its job ID and return its result.
+
+    A job that was interrupted continues from its last checkpoint instead
+    of starting over. Raises ValueError with the workflow's error message
+    if a node failed.
+    """
+    config = {"configurable": {"thread_id": job_id}}
+    snapshot = await resume_workflow.aget_state(config)
+
+    if not snapshot.values or snapshot.next:
+        initial_state = None
+        if snapshot.values:
+            logger.info(f"Resuming job {job_id} at {', '.join(snapshot.next)}")
+        else:
+            initial_state = create_initial_state(resume_text)
+        async for event in stream_resume_analysis(initial_state, config):
+            if event.type == "error":
+                raise ValueError(event.content)
+
+    values = (await resume_workflow.aget_state(config)).values
+    if values.get("error"):
+        raise ValueError(values["error"])
+    return {"checkpoint_id": job_id, **{key: values.get(key) for key in RESULT_KEYS}}
+
+class JobWorkerPool:
+    """
+    Fixed number of workers per process taking jobs from the store.
+
+    Jobs submitted to this process wake an idle worker at once; jobs
+    submitted to other workers of the host are picked up within
+    poll_interval_seconds.
+    """
+
+    def __init__(self, store: JobStore, size: int, *, poll_interval_seconds: float = 1.0, ttl_seconds: float = 0.0):
+        self.store = store
+        self.size = size
+        self.poll_interval_seconds = poll_interval_seconds
+        self.ttl_seconds = ttl_seconds
+        self.owner = process_owner()
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_purge = time.monotonic()
+
+    def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._work(i)) for i in range(self.size)]
+
+    def notify(self) -> None:
+        """Wake an idle worker because a job was just queued"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self) -> None:
+        """Cancel the workers and queue their unfinished jobs again"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        released = await self.store.release(self.owner)
+        if released:
+            logger.info(f"Released {released} unfinished analysis jobs")
+
+    async def _wait(self) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), self.poll_interval_seconds)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _purge(self) -> None:
+        if time.monotonic() - self._last_purge < Config.CHECKPOINT_PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = time.monotonic()
+        purged = await self.store.purge_finished(self.ttl_seconds)
+        if purged:
+            logger.info(f"Removed {purged} finished analysis jobs")
+
+    async def _work(self, index: int) -> None:
+        while True:
+            try:
+                job = await self.store.claim(self.owner)
+                if job is None:
+                    await self._purge()
+                    await self._wait()
+                    continue
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {index} failed: {str(e)}")
+                await asyncio.sleep(self.poll_interval_seconds)
+
+    async def _keep_alive(self, job_id: str) -> None:
+        while True:
+            await asyncio.sleep(self.store.stale_seconds / 3)
+            try:
+                if not await self.store.heartbeat(job_id, self.owner):
+                    logger.warning(f"Lost job {job_id} to another worker")
+                    return
+            except Exception as e:
+                # A missed beat (the database briefly locked) is retried; the job is stale only after several
+                logger.error(f"Heartbeat for job {job_id} failed: {str(e)}")
+
+    async def _run(self, job: Dict[str, Any]) -> None:
+        job_id = job["job_id"]
+        if job["attempts"] == 1:
+            JOB_QUEUE_WAIT.observe(job["started_at"] - job["created_at"])
+        logger.info(f"Starting job {job_id} (attempt {job['attempts']})")
+
+        keep_alive = asyncio.create_task(self._keep_alive(job_id))
+        try:
+            result = await run_analysis_job(job_id, job["resume_text"])
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            if await self.store.finish(job_id, self.owner, error=f"Analysis failed: {str(e)}"):
+                JOBS_FINISHED.labels(outcome="failed").inc()
+            return
+        finally:
+            keep_alive.cancel()
+
+        if await self.store.finish(job_id, self.owner, result=result):
+            JOBS_FINISHED.labels(outcome="succeeded").inc()
+
+async def stream_job_events(
+    store: JobStore,
+    job_id: str,
+    poll_interval_seconds: float
+) -> AsyncGenerator[StreamResponse, None]:
+    """
+    Follow a job until it finishes: a `status` event when its status
+    changes, a `progress` event for each node recorded in its checkpoints,
+    then `complete` or `error`.
+
+    Everything is read from the job table and the checkpoint store, so
+    any worker of the host can serve the subscription.
+    """
+    status = node = None
+    while True:
+        job = await store.get(job_id)
+        if job is None:
+            yield StreamResponse(type="error", content=f"Job {job_id} no longer exists")
+            return
+
+        finished = job["status"] in ("succeeded", "failed")
+        if job["status"] != status and not finished:
+            status = job["status"]
+            yield StreamResponse(type="status", content=status, checkpoint_id=job_id)
+
+        if job["status"] != "queued":
+            progress = await job_progress(job_id)
+            if progress["node"] and progress["node"] != node:
+                node = progress["node"]
+                yield StreamResponse(type="progress", content=node, checkpoint_id=job_id)
+
+        # The final status follows the last progress event
+        if finished:
+            yield StreamResponse(type="status", content=job["status"], checkpoint_id=job_id)
+            if job["status"] == "succeeded":
+                yield StreamResponse(type="complete", content="Analysis completed successfully", checkpoint_id=job_id)
+            else:
+                yield StreamResponse(type="error", content=job["error"] or "Analysis failed")
+            return
+
+        await asyncio.sleep(poll_interval_seconds)
+
+job_store = JobStore(
+    Config.JOB_QUEUE_DB_PATH,
+    busy_timeout_ms=Config.CHECKPOINT_BUSY_TIMEOUT_MS,
+    stale_seconds=Config.JOB_STALE_SECONDS,
+    max_attempts=Config.JOB_MAX_ATTEMPTS
+)
+job_pool = JobWorkerPool(
+    job_store,
+    Config.JOB_WORKERS,
+    poll_interval_seconds=Config.JOB_POLL_INTERVAL_SECONDS,
+    ttl_seconds=Config.JOB_TTL_SECONDS
+)
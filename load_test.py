@@ -0,0 +1,172 @@
+"""
+Load generator for the Resume Analysis API.
+
+Drives /analyze-resume at a target concurrency and reports latency
+percentiles, time to first event, throughput and whether requests overlap
+in time (async workflow) or run one after another (blocked event loop).
+The root endpoint is probed while the analyses are in flight.
+
+Start the server with LLM_BACKEND=fake to benchmark the service itself
+without an OpenAI key or API spend.
+"""
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from test_examples.sample_resumes import SAMPLE_RESUME_1, SAMPLE_RESUME_2
+
+BASE_URL = "http://localhost:8000"
+SAMPLE_RESUMES = [SAMPLE_RESUME_1, SAMPLE_RESUME_2]
+
+def run_analysis(index, unique=False):
+    """Run one streamed analysis and record its timings"""
+    resume_text = SAMPLE_RESUMES[index % len(SAMPLE_RESUMES)]
+    if unique:
+        # Distinct content bypasses the result cache and request coalescing
+        resume_text += f"\nReference: load-{index}-{time.time_ns()}"
+    started = time.perf_counter()
+    first_event = None
+    status = "incomplete"
+
+    try:
+        response = requests.post(
+            f"{BASE_URL}/analyze-resume",
+            json={"resume_text": resume_text},
+            stream=True
+        )
+        for line in response.iter_lines():
+            if not line:
+                continue
+            line_str = line.decode('utf-8')
+            if line_str.startswith('data: '):
+                if first_event is None:
+                    first_event = time.perf_counter()
+                data = json.loads(line_str[6:])
+                if data['type'] in ('complete', 'error'):
+                    status = data['type']
+                    break
+    except requests.exceptions.ConnectionError:
+        raise
+    except requests.exceptions.RequestException:
+        status = "failed"
+
+    return {
+        "index": index,
+        "status": status,
+        "start": started,
+        "first_event": first_event,
+        "end": time.perf_counter()
+    }
+
+def probe_health(stop):
+    """Measure root endpoint latency while analyses are running"""
+    latencies = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            requests.get(f"{BASE_URL}/", timeout=30)
+            latencies.append(time.perf_counter() - started)
+        except requests.exceptions.RequestException:
+            latencies.append(float("inf"))
+        stop.wait(0.5)
+    return latencies
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = min(len(ordered) - 1, max(0, int(pct / 100.0 * len(ordered) + 0.999999) - 1))
+    return ordered[rank]
+
+def max_in_flight(results):
+    """Largest number of requests the server was streaming at the same moment"""
+    events = []
+    for result in results:
+        if result["first_event"] is None:
+            continue
+        events.append((result["first_event"], 1))
+        events.append((result["end"], -1))
+
+    current = peak = 0
+    for _, delta in sorted(events):
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+def print_distribution(label, values):
+    print(
+        f"{label:<24}p50={percentile(values, 50):.3f}s "
+        f"p95={percentile(values, 95):.3f}s "
+        f"p99={percentile(values, 99):.3f}s"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for /analyze-resume")
+    parser.add_argument("--concurrency", type=int, default=10, help="requests kept in flight")
+    parser.add_argument("--requests", type=int, default=None, help="total requests (default: --concurrency)")
+    parser.add_argument("--unique", action="store_true", help="make every resume unique to bypass caching")
+    parser.add_argument("--verbose", action="store_true", help="print the timeline of every request")
+    args = parser.parse_args()
+    total = args.requests or args.concurrency
+
+    print(f"Sending {total} analyses to {BASE_URL} at concurrency {args.concurrency}")
+    print("=" * 50)
+
+    stop_probe = threading.Event()
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=1) as probe_pool:
+        health = probe_pool.submit(probe_health, stop_probe)
+        try:
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                results = list(pool.map(lambda i: run_analysis(i, args.unique), range(total)))
+        finally:
+            stop_probe.set()
+        health_latencies = health.result()
+    wall = time.perf_counter() - wall_start
+
+    # Only the streaming window counts: time spent queued behind other requests is excluded
+    active = [r["end"] - r["first_event"] for r in results if r["first_event"] is not None]
+    serial = sum(active)
+    peak = max_in_flight(results)
+
+    completed = [r for r in results if r["status"] == "complete"]
+    latencies = [r["end"] - r["start"] for r in completed]
+    first_events = [r["first_event"] - r["start"] for r in results if r["first_event"] is not None]
+    statuses = {}
+    for result in results:
+        statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+
+    if args.verbose:
+        for result in sorted(results, key=lambda r: r["start"]):
+            print(
+                f"#{result['index']:>3} {result['status']:<10} "
+                f"start=+{result['start'] - wall_start:6.2f}s "
+                f"end=+{result['end'] - wall_start:6.2f}s"
+            )
+        print("-" * 50)
+
+    print(f"Results:                {statuses}")
+    print(f"Wall time:              {wall:.2f}s")
+    print(f"Throughput:             {len(completed) / wall:.2f} req/s")
+    print_distribution("Latency:", latencies)
+    print_distribution("Time to first event:", first_events)
+    print(f"Sum of streaming times: {serial:.2f}s")
+    print(f"Overlap factor:         {serial / wall:.2f}x")
+    print(f"Peak streams in flight: {peak}/{args.concurrency}")
+    if health_latencies:
+        print(f"Max probe latency:      {max(health_latencies):.3f}s")
+
+    if peak > 1:
+        print("Requests overlapped: the event loop is serving analyses concurrently")
+    else:
+        print("Requests ran one after another: something is blocking the event loop")
+
+if __name__ == "__main__":
+    try:
+        main()
+    except requests.exceptions.ConnectionError:
+        print("Error: Could not connect to the API. Make sure it's running on localhost:8000")
@@ -1,18 +1,28 @@
 import asyncio
 import json
 import logging
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import RedirectResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from prometheus_client import CONTENT_TYPE_LATEST
 
 from app.models.resume_models import (
     ResumeAnalysisRequest, CheckpointResumeRequest, StreamResponse
 )
 from app.workflow.resume_graph import (
-    resume_workflow, generate_thread_id, resume_from_checkpoint
+    CheckpointBusyError, resume_workflow, create_initial_state, generate_thread_id, resume_from_checkpoint
 )
+from app.workflow.resume_stream import reconnect_analysis, stream_coalesced_analysis
+from app.workflow.batch_analysis import parse_batch_body, run_batch
+from app.workflow.job_queue import job_pool, job_progress, job_store, stream_job_events
+from app.nodes.prompts import build_chains
+from app.utils.result_cache import analysis_cache, node_cache
+from app.utils.config import Config
+from app.utils.metrics import render_metrics
+from app.utils.routing import NODE_ID, owner_url
+from app.utils.sse import format_event, parse_event_id, with_heartbeats
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -34,13 +44,58 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def warm_up_chains():
+    """Build the shared LLM client and node chains before serving requests"""
+    try:
+        build_chains()
+    except ValueError as e:
+        logger.warning(f"Chains not prebuilt: {str(e)}")
+
+# Thread read by /health; it is never written, so health checks add no checkpoints
+HEALTH_THREAD_ID = "health_check"
+
+retention_task = None
+
+@app.on_event("startup")
+async def start_checkpoint_retention():
+    """Purge expired and superseded checkpoints in the background"""
+    global retention_task
+    retention_task = asyncio.create_task(
+        resume_workflow.checkpointer.run_retention(Config.CHECKPOINT_PURGE_INTERVAL_SECONDS)
+    )
+
+@app.on_event("startup")
+async def start_job_workers():
+    """Start the worker pool that runs queued /jobs analyses"""
+    job_pool.start()
+
+@app.on_event("shutdown")
+async def close_databases():
+    """Flush pending checkpoint writes and close the SQLite connections"""
+    if retention_task is not None:
+        retention_task.cancel()
+    # Unfinished jobs go back to the queue and continue from their checkpoints after a restart
+    await job_pool.stop()
+    await job_store.close()
+    await resume_workflow.checkpointer.aclose()
+    await analysis_cache.close()
+    await node_cache.close()
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
     return {"message": "Resume Analysis API is running", "status": "healthy"}
 
+# Streaming responses must reach the client as they are written, also through buffering proxies
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "X-Accel-Buffering": "no"
+}
+
 @app.post("/analyze-resume")
-async def analyze_resume(request: ResumeAnalysisRequest):
+async def analyze_resume(request: ResumeAnalysisRequest, last_event_id: Optional[str] = Header(None)):
     """
     Analyze resume and stream summary and first question asynchronously.
     
@@ -49,83 +104,45 @@ async def analyze_resume(request: ResumeAnalysisRequest):
     2. Streams the summary as it's generated
     3. Streams the first interview question when ready
     4. Returns a checkpoint ID for resumption
+    
+    Events are sent as text/event-stream frames with IDs. A client that
+    lost the connection sends the same request again with a
+    `Last-Event-ID` header and receives the events after that one, from
+    the running analysis or its checkpoint, without a new analysis.
     """
     
+    if last_event_id:
+        parsed = parse_event_id(last_event_id)
+        if parsed is None:
+            raise HTTPException(status_code=400, detail=f"Invalid Last-Event-ID: {last_event_id}")
+        # The thread's checkpoints are kept on the node that started it
+        redirect = owner_url(parsed[0], "/analyze-resume")
+        if redirect:
+            return RedirectResponse(redirect, status_code=307)
+    
     async def generate_stream() -> AsyncGenerator[str, None]:
-        thread_id = generate_thread_id()
-        config = {"configurable": {"thread_id": thread_id}}
-        
         try:
-            # Initialize state
-            initial_state = {
-                "raw_text": request.resume_text,
-                "work_experiences": [],
-                "education": [],
-                "summary": "",
-                "insights": [],
-                "questions": [],
-                "current_node": "start",
-                "error": None
-            }
-            
-            logger.info(f"Starting resume analysis for thread {thread_id}")
-            
-            # Process through the workflow step by step
-            current_state = initial_state
-            
-            # Run extraction nodes
-            for node_name in ["start", "extract_work", "extract_education"]:
-                result = resume_workflow.invoke(current_state, config)
-                current_state = result
+            if last_event_id:
+                logger.info(f"Reconnecting stream after event {last_event_id}")
+                events = reconnect_analysis(last_event_id)
+            else:
+                thread_id = generate_thread_id()
+                config = {"configurable": {"thread_id": thread_id}}
                 
-                if current_state.get("error"):
-                    error_response = StreamResponse(
-                        type="error", 
-                        content=current_state["error"]
-                    )
-                    yield f"data: {error_response.json()}\n\n"
-                    return
-            
-            # Generate and stream summary
-            result = resume_workflow.invoke(current_state, config)
-            current_state = result
-            
-            if current_state.get("summary"):
-                # Stream summary in chunks for better UX
-                summary_lines = current_state["summary"].split('. ')
-                for i, line in enumerate(summary_lines):
-                    if line.strip():
-                        chunk = line.strip() + ('.' if i < len(summary_lines) - 1 else '')
-                        summary_response = StreamResponse(
-                            type="summary",
-                            content=chunk
-                        )
-                        yield f"data: {summary_response.json()}\n\n"
-                        await asyncio.sleep(0.2)  # Streaming delay
-            
-            # Complete insights and questions generation
-            for node_name in ["extract_insights", "generate_questions"]:
-                result = resume_workflow.invoke(current_state, config)
-                current_state = result
-            
-            # Stream first question
-            if current_state.get("questions") and len(current_state["questions"]) > 0:
-                first_question = current_state["questions"][0]
-                question_response = StreamResponse(
-                    type="question",
-                    content=first_question
-                )
-                yield f"data: {question_response.json()}\n\n"
-            
-            # Send completion with checkpoint ID
-            complete_response = StreamResponse(
-                type="complete",
-                content="Analysis completed successfully",
-                checkpoint_id=thread_id
-            )
-            yield f"data: {complete_response.json()}\n\n"
+                # Initialize state
+                initial_state = create_initial_state(request.resume_text)
+                
+                logger.info(f"Starting resume analysis for thread {thread_id}")
+                
+                # Run the workflow once (or join an identical running analysis); summary
+                # tokens and node results arrive as they are produced
+                events = stream_coalesced_analysis(initial_state, config)
             
-            logger.info(f"Resume analysis completed for thread {thread_id}")
+            async for event in events:
+                yield format_event(event)
+                if event.type in ("error", "complete"):
+                    logger.info(f"Resume analysis stream ended with {event.type} event {event.id}")
+                    return
             
         except Exception as e:
             logger.error(f"Error in resume analysis: {str(e)}")
@@ -133,18 +150,120 @@ async def analyze_resume(request: ResumeAnalysisRequest):
                 type="error",
                 content=f"Analysis failed: {str(e)}"
             )
-            yield f"data: {error_response.json()}\n\n"
+            yield format_event(error_response)
     
     return StreamingResponse(
-        generate_stream(),
-        media_type="text/plain",
+        with_heartbeats(generate_stream(), Config.STREAM_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
         headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Content-Type": "text/plain; charset=utf-8"
+            **SSE_HEADERS,
+            # Lets a load balancer pin follow-up requests for this checkpoint to this node
+            **({"X-Resume-Node": NODE_ID} if NODE_ID else {})
         }
     )
 
+@app.post("/analyze-resumes")
+async def analyze_resumes(request: Request):
+    """
+    Analyze a batch of resumes.
+    
+    Accepts NDJSON (one ResumeAnalysisRequest per line) or a JSON array of
+    requests. Resumes are processed with bounded concurrency and each result
+    is streamed back as an NDJSON line, with its own checkpoint ID, as soon
+    as it finishes.
+    """
+    
+    try:
+        items = parse_batch_body(await request.body(), Config.BATCH_MAX_ITEMS)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    
+    logger.info(f"Starting batch analysis of {len(items)} resumes")
+    
+    async def generate_results() -> AsyncGenerator[str, None]:
+        async for result in run_batch(items, Config.BATCH_CONCURRENCY):
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(
+        generate_results(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: ResumeAnalysisRequest):
+    """
+    Queue a resume analysis and return its job ID right away.
+    
+    A pool of background workers runs queued jobs; the queue is kept in
+    SQLite and survives restarts. Follow a job with GET /jobs/{job_id} or
+    the event stream at GET /jobs/{job_id}/events. The job ID is also the
+    checkpoint ID of the finished analysis.
+    """
+    
+    if Config.JOB_MAX_QUEUED and await job_store.count_queued() >= Config.JOB_MAX_QUEUED:
+        raise HTTPException(status_code=429, detail="Job queue is full; retry later")
+    
+    job = await job_store.submit(generate_thread_id(), request.resume_text)
+    job_pool.notify()
+    logger.info(f"Queued job {job['job_id']}")
+    
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "status_url": f"/jobs/{job['job_id']}",
+        "events_url": f"/jobs/{job['job_id']}/events"
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of a queued job, its progress while running, and its result once finished"""
+    
+    redirect = owner_url(job_id, f"/jobs/{job_id}")
+    if redirect:
+        return RedirectResponse(redirect, status_code=307)
+    
+    job = await job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job found for ID: {job_id}")
+    
+    response = {
+        "job_id": job_id,
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"]
+    }
+    if job["status"] == "running":
+        response["progress"] = await job_progress(job_id)
+    if job["status"] == "succeeded":
+        response["result"] = job["result"]
+    if job["status"] == "failed":
+        response["error"] = job["error"]
+    return response
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-Sent Events with a job's status changes and node progress until it finishes"""
+    
+    redirect = owner_url(job_id, f"/jobs/{job_id}/events")
+    if redirect:
+        return RedirectResponse(redirect, status_code=307)
+    
+    if await job_store.get(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"No job found for ID: {job_id}")
+    
+    async def generate_events() -> AsyncGenerator[str, None]:
+        async for event in stream_job_events(job_store, job_id, Config.JOB_POLL_INTERVAL_SECONDS):
+            yield format_event(event)
+    
+    return StreamingResponse(
+        with_heartbeats(generate_events(), Config.STREAM_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
 @app.post("/resume-questions")
 async def resume_questions(request: CheckpointResumeRequest):
     """
@@ -154,23 +273,32 @@ async def resume_questions(request: CheckpointResumeRequest):
     directly from the question generation node.
     """
     
+    # A checkpoint kept on another node is resumed there; 307 preserves the POST body
+    redirect = owner_url(request.checkpoint_id, "/resume-questions")
+    if redirect:
+        return RedirectResponse(redirect, status_code=307)
+    
+    # A job's checkpoint ID is its job ID; its analysis may not have started yet
+    job = await job_store.get(request.checkpoint_id)
+    if job is not None and job["status"] in ("queued", "running"):
+        raise HTTPException(status_code=409, detail=f"Job {request.checkpoint_id} has not finished")
+    
     try:
         logger.info(f"Resuming from checkpoint: {request.checkpoint_id}")
         
-        # Resume from checkpoint
-        current_state, config = resume_from_checkpoint(
-            request.checkpoint_id, 
-            "generate_questions"
-        )
-        
-        # Update state with provided data if available
+        # Caller-provided data replaces the saved values
+        updates = {}
         if request.insights:
-            current_state["insights"] = request.insights
+            updates["insights"] = request.insights
         if request.summary:
-            current_state["summary"] = request.summary
+            updates["summary"] = request.summary
         
-        # Resume workflow from question generation
-        result = resume_workflow.invoke(current_state, config)
+        # Only question generation runs; earlier nodes keep their saved results
+        result = await resume_from_checkpoint(
+            request.checkpoint_id,
+            "generate_questions",
+            updates
+        )
         
         if result.get("error"):
             raise HTTPException(status_code=500, detail=result["error"])
@@ -182,6 +310,9 @@ async def resume_questions(request: CheckpointResumeRequest):
             "status": "success"
         }
         
+    except CheckpointBusyError as be:
+        logger.warning(f"Checkpoint busy: {str(be)}")
+        raise HTTPException(status_code=409, detail=str(be))
     except ValueError as ve:
         logger.error(f"Checkpoint error: {str(ve)}")
         raise HTTPException(status_code=404, detail=str(ve))
@@ -193,18 +324,16 @@ async def resume_questions(request: CheckpointResumeRequest):
 async def health_check():
     """Detailed health check"""
     try:
-        # Test workflow creation
-        test_state = {"raw_text": "test", "current_node": "start"}
-        thread_id = generate_thread_id()
-        config = {"configurable": {"thread_id": thread_id}}
-        
-        # Quick workflow test
-        resume_workflow.invoke(test_state, config)
+        # Round-trip to the checkpoint store without starting a new thread
+        config = {"configurable": {"thread_id": HEALTH_THREAD_ID}}
+        await resume_workflow.aget_state(config)
         
         return {
             "status": "healthy",
             "workflow": "operational",
-            "checkpointing": "enabled"
+            "checkpointing": "enabled",
+            "checkpoint_backend": Config.CHECKPOINT_BACKEND,
+            "node": NODE_ID or None
         }
     except Exception as e:
         return {
@@ -212,11 +341,18 @@ async def health_check():
             "error": str(e)
         }
 
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: node and model latency, tokens, parser failures, checkpoint writes"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
     import uvicorn
+    # Worker processes import the app themselves, so it is passed by name
     uvicorn.run(
-        app, 
+        "app.main:app", 
         host="0.0.0.0", 
         port=8000,
+        workers=Config.MAX_WORKERS,
         log_level="info"
     )
\ No newline at end of file
@@ -0,0 +1,192 @@
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+
+logger = logging.getLogger(__name__)
+
+# Buckets cover fast local nodes up to slow multi-call LLM nodes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+NODE_DURATION = Histogram(
+    "resume_node_duration_seconds",
+    "Wall time of a workflow node",
+    ["node"],
+    buckets=LATENCY_BUCKETS
+)
+NODE_ERRORS = Counter(
+    "resume_node_errors_total",
+    "Workflow nodes that raised an exception",
+    ["node"]
+)
+NODE_FALLBACKS = Counter(
+    "resume_node_fallbacks_total",
+    "Workflow nodes that returned default values instead of model output",
+    ["node"]
+)
+PARSER_FAILURES = Counter(
+    "resume_parser_failures_total",
+    "Model outputs that could not be parsed into the node schema",
+    ["node"]
+)
+LLM_LATENCY = Histogram(
+    "resume_llm_latency_seconds",
+    "Latency of a single chat model call",
+    ["chain"],
+    buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "resume_llm_tokens_total",
+    "Tokens used by chat model calls",
+    ["chain", "kind"]
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "resume_llm_queue_depth",
+    "Model calls waiting for the rate limiter",
+    multiprocess_mode="livesum"
+)
+LLM_QUEUE_WAIT = Histogram(
+    "resume_llm_queue_wait_seconds",
+    "Time a model call waited for the rate limiter",
+    buckets=LATENCY_BUCKETS
+)
+LLM_CONCURRENCY_LIMIT = Gauge(
+    "resume_llm_concurrency_limit",
+    "Current adaptive limit on concurrent model calls",
+    multiprocess_mode="liveall"
+)
+LLM_RETRIES = Counter(
+    "resume_llm_retries_total",
+    "Model calls retried after a transient failure",
+    ["reason"]
+)
+STRUCTURED_REPAIRS = Counter(
+    "resume_structured_repairs_total",
+    "Invalid structured outputs re-asked from the model, by outcome (repaired, dropped, failed)",
+    ["chain", "outcome"]
+)
+FAST_PATH_RESULTS = Counter(
+    "resume_fast_path_total",
+    "Resume sections read by the rule-based parser ('parsed') or sent to the LLM ('llm')",
+    ["section", "outcome"]
+)
+EXTRACTION_CHUNKS = Histogram(
+    "resume_extraction_chunks",
+    "Chunks a resume was split into for one extraction node",
+    ["node"],
+    buckets=(1, 2, 4, 8, 16, 32)
+)
+CHECKPOINT_WRITE_DURATION = Histogram(
+    "resume_checkpoint_write_seconds",
+    "Time to persist a workflow checkpoint",
+    buckets=LATENCY_BUCKETS
+)
+CHECKPOINT_BATCH_SIZE = Histogram(
+    "resume_checkpoint_batch_size",
+    "Checkpoints committed together in one transaction",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+CHECKPOINTS_PURGED = Counter(
+    "resume_checkpoints_purged_total",
+    "Checkpoint rows or threads removed by retention",
+    ["reason"]
+)
+
+RUN_CANCELLATIONS = Counter(
+    "resume_run_cancellations_total",
+    "Analyses stopped because every client streaming them disconnected, by disconnect policy",
+    ["policy"]
+)
+JOBS_FINISHED = Counter(
+    "resume_jobs_total",
+    "Queued analysis jobs that succeeded, failed, or were requeued after their worker stopped",
+    ["outcome"]
+)
+JOB_QUEUE_WAIT = Histogram(
+    "resume_job_queue_wait_seconds",
+    "Time a job waited in the queue before a worker started it",
+    buckets=LATENCY_BUCKETS + (120, 300, 600)
+)
+
+def render_metrics() -> bytes:
+    """
+    Metrics in the Prometheus text format.
+
+    With several workers, PROMETHEUS_MULTIPROC_DIR must name an empty
+    directory shared by them; a scrape then aggregates every process
+    instead of reporting whichever worker happened to answer.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+def record_parser_fallback(node: str) -> None:
+    """Count an unparseable model output that the node replaced with defaults"""
+    PARSER_FAILURES.labels(node=node).inc()
+    NODE_FALLBACKS.labels(node=node).inc()
+
+def _token_usage(response: LLMResult) -> Tuple[int, int]:
+    """Prompt and completion tokens reported by the provider, if any"""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+
+    # Streamed runs report usage on the message instead (the models are built with stream_usage=True)
+    prompt_tokens = completion_tokens = 0
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt_tokens += metadata.get("input_tokens", 0)
+            completion_tokens += metadata.get("output_tokens", 0)
+    return prompt_tokens, completion_tokens
+
+class LLMMetricsHandler(AsyncCallbackHandler):
+    """
+    Records latency and token usage of every chat model call.
+
+    Chains label their model with a "chain" metadata entry (see
+    prompts.get_chain) so calls can be attributed to a node.
+    """
+
+    def __init__(self):
+        self._runs: Dict[UUID, Tuple[str, float]] = {}
+
+    async def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[Any]],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> None:
+        chain = (metadata or {}).get("chain", "unknown")
+        self._runs[run_id] = (chain, time.perf_counter())
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        chain, started = run
+        LLM_LATENCY.labels(chain=chain).observe(time.perf_counter() - started)
+
+        prompt_tokens, completion_tokens = _token_usage(response)
+        if prompt_tokens:
+            LLM_TOKENS.labels(chain=chain, kind="prompt").inc(prompt_tokens)
+        if completion_tokens:
+            LLM_TOKENS.labels(chain=chain, kind="completion").inc(completion_tokens)
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            LLM_LATENCY.labels(chain=run[0]).observe(time.perf_counter() - run[1])
+
+# Shared by every chain; attached once when the chains are built
+llm_metrics_handler = LLMMetricsHandler()
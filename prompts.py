@@ -0,0 +1,225 @@
+from typing import Dict, Optional, Tuple, Type
+from langchain.prompts import PromptTemplate
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel
+
+from app.models.resume_models import (
+    WorkExperienceList, EducationList, ResumeExtraction, ResumeInsights,
+    InterviewQuestion, InterviewQuestions
+)
+from app.utils.config import Config
+from app.utils.metrics import llm_metrics_handler
+
+# Bump whenever a prompt changes so cached results from older prompts are not reused
+PROMPT_VERSION = "3"
+
+# Tag attached to the summary model run so streamed tokens can be told apart
+SUMMARY_STREAM_TAG = "resume_summary_stream"
+
+# Prompts are built once at import. Structured chains get their schema as a
+# forced tool call, so the prompts carry no JSON format instructions
+WORK_EXPERIENCE_PROMPT = PromptTemplate(
+    template="""
+Extract work experience information from the resume text below. Be precise and accurate.
+
+Resume Text:
+{resume_text}
+
+Instructions:
+- Extract company names, job titles, dates, and descriptions
+- Use YYYY-MM format for dates, or "Present" for current positions
+- If no work experience found, return empty list
+- Be thorough but accurate
+    """,
+    input_variables=["resume_text"]
+)
+
+EDUCATION_PROMPT = PromptTemplate(
+    template="""
+Extract education information from the resume text below.
+
+Resume Text:
+{resume_text}
+
+Instructions:
+- Extract institution names, degrees, fields of study, and years
+- Use 4-digit years (e.g., 2020)
+- If no education found, return empty list
+- Be accurate with degree types and field names
+    """,
+    input_variables=["resume_text"]
+)
+
+RESUME_EXTRACTION_PROMPT = PromptTemplate(
+    template="""
+Extract work experience, education and skills from the resume text below. Be precise and accurate.
+
+Resume Text:
+{resume_text}
+
+Instructions:
+- Work experience: extract company names, job titles, dates, and descriptions
+- Use YYYY-MM format for work dates, or "Present" for current positions
+- Education: extract institution names, degrees, fields of study, and 4-digit years
+- Skills: list individual technical and professional skills
+- Use an empty list for any section that is not present
+- Be thorough but accurate
+    """,
+    input_variables=["resume_text"]
+)
+
+SUMMARY_PROMPT = PromptTemplate(
+    template="""
+Create a professional resume summary based on the structured data below.
+
+Work Experience:
+{work_experience}
+
+Education:
+{education}
+
+Original Resume Text (for context):
+{resume_text}
+
+Instructions:
+- Write a concise, professional summary (2-3 paragraphs)
+- Highlight key qualifications, skills, and achievements
+- Make it compelling for recruiters
+- Focus on career progression and notable accomplishments
+- If data is limited, work with what's available
+    """,
+    input_variables=["work_experience", "education", "resume_text"]
+)
+
+INSIGHTS_PROMPT = PromptTemplate(
+    template="""
+Extract key professional insights from the resume data below.
+
+Summary: {summary}
+
+Work Experience: {work_experience}
+
+Education: {education}
+
+Instructions:
+- Identify years of experience in specific areas
+- Note leadership roles and team management experience
+- Highlight technical skills and expertise
+- Mention educational background and certifications
+- Point out career progression and achievements
+- Focus on quantifiable and notable aspects
+    """,
+    input_variables=["summary", "work_experience", "education"]
+)
+
+QUESTIONS_PROMPT = PromptTemplate(
+    template="""
+Generate tailored interview questions based on the resume insights below.
+
+Resume Insights:
+{insights}
+
+Instructions:
+- Create 5-7 specific, thoughtful interview questions
+- Mix behavioral, technical, and situational questions
+- Target the candidate's specific experience and skills
+- Include questions about leadership, problem-solving, and technical expertise
+- Make questions open-ended and insightful
+- Avoid generic questions
+    """,
+    input_variables=["insights"]
+)
+
+FIRST_QUESTION_PROMPT = PromptTemplate(
+    template="""
+Write one interview question for the candidate based on the resume data below.
+
+Work Experience:
+{work_experience}
+
+Education:
+{education}
+
+Skills: {skills}
+
+Instructions:
+- Ask about a specific role, project or skill from the data above
+- Make it open-ended, answerable in a few minutes
+- Return a single question
+    """,
+    input_variables=["work_experience", "education", "skills"]
+)
+
+REPAIR_PROMPT = PromptTemplate(
+    template="""
+The {schema_name} below failed validation.
+
+{schema_name}:
+{fragment}
+
+Errors:
+{errors}
+
+Instructions:
+- Return the corrected {schema_name}
+- Fix only what the errors describe and keep every other value unchanged
+    """,
+    input_variables=["schema_name", "fragment", "errors"]
+)
+
+# Chain name -> (prompt, output schema); the summary is streamed as plain text
+CHAIN_SPECS: Dict[str, Tuple[PromptTemplate, Optional[Type[BaseModel]]]] = {
+    "work_experience": (WORK_EXPERIENCE_PROMPT, WorkExperienceList),
+    "education": (EDUCATION_PROMPT, EducationList),
+    "resume_extraction": (RESUME_EXTRACTION_PROMPT, ResumeExtraction),
+    "summary": (SUMMARY_PROMPT, None),
+    "insights": (INSIGHTS_PROMPT, ResumeInsights),
+    "questions": (QUESTIONS_PROMPT, InterviewQuestions),
+    "first_question": (FIRST_QUESTION_PROMPT, InterviewQuestion),
+}
+
+_chains: Dict[str, Runnable] = {}
+
+def _structured_llm(name: str, schema: Type[BaseModel]) -> Runnable:
+    """Model forced to answer with a call to the schema's tool"""
+    # The chain name labels the model's latency and token metrics
+    return Config.get_llm().bind_tools([schema], tool_choice=schema.__name__).with_config(
+        metadata={"chain": name},
+        callbacks=[llm_metrics_handler]
+    )
+
+def get_chain(name: str) -> Runnable:
+    """
+    Return the prompt | llm chain for a node, building it once per process.
+
+    Structured chains return the model's message with a tool call; see
+    structured_output.parse_structured for validation and repair.
+    """
+    chain = _chains.get(name)
+    if chain is None:
+        prompt, schema = CHAIN_SPECS[name]
+        if schema is None:
+            llm = Config.get_llm().with_config(
+                metadata={"chain": name},
+                callbacks=[llm_metrics_handler],
+                tags=[SUMMARY_STREAM_TAG]
+            )
+        else:
+            llm = _structured_llm(name, schema)
+        chain = prompt | llm
+        _chains[name] = chain
+    return chain
+
+def get_repair_chain(name: str, schema: Type[BaseModel]) -> Runnable:
+    """Chain that re-asks for one invalid fragment (an entry or a whole object) of a node's output"""
+    key = f"{name}_repair:{schema.__name__}"
+    chain = _chains.get(key)
+    if chain is None:
+        chain = REPAIR_PROMPT | _structured_llm(f"{name}_repair", schema)
+        _chains[key] = chain
+    return chain
+
+def build_chains() -> None:
+    """Build every chain up front so requests never pay for it"""
+    for name in CHAIN_SPECS:
+        get_chain(name)
@@ -0,0 +1,319 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional, Sequence
+
+import httpx
+import openai
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import LanguageModelInput
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable
+
+from app.utils.metrics import (
+    LLM_CONCURRENCY_LIMIT, LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT, LLM_RETRIES
+)
+from app.utils.tokenizer import count_tokens
+
+logger = logging.getLogger(__name__)
+
+def estimate_tokens(text: str) -> int:
+    """Prompt token count used for budgeting"""
+    return max(1, count_tokens(text))
+
+def classify_error(error: BaseException) -> Optional[str]:
+    """Reason a failed call is worth retrying, or None if it is not"""
+    status = getattr(error, "status_code", None)
+    if status == 429:
+        return "rate_limited"
+    if status is not None and status >= 500:
+        return "server_error"
+    if isinstance(error, (openai.APITimeoutError, httpx.TimeoutException, asyncio.TimeoutError)):
+        return "timeout"
+    if isinstance(error, (openai.APIConnectionError, httpx.TransportError)):
+        return "connection"
+    return None
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Delay requested by the provider through Retry-After headers, if any"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000.0
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        # HTTP-date values are rare from model providers; fall back to backoff
+        pass
+    return None
+
+class TokenBucket:
+    """Per-minute budget refilled continuously; a limit of 0 means unlimited"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+        # Held while waiting so callers are served in arrival order
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float) -> None:
+        if self.capacity <= 0:
+            return
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, amount: float) -> None:
+        """Charge (or refund, if negative) the difference between estimated and actual use"""
+        if self.capacity <= 0:
+            return
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency limit: grows by one per limit's worth of successful
+    calls and halves when the provider signals overload.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, decrease_cooldown: float = 1.0):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.decrease_cooldown = decrease_cooldown
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+
+    async def acquire(self) -> None:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, overloaded: bool = False) -> None:
+        async with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if overloaded:
+                # One overload burst halves the limit once, not once per failed call
+                if now - self._last_decrease >= self.decrease_cooldown:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            LLM_CONCURRENCY_LIMIT.set(self.limit)
+            self._condition.notify_all()
+
+class LLMRateLimiter:
+    """Shared gate for model calls: request and token buckets, adaptive concurrency and retry policy"""
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        max_retries: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.concurrency = AdaptiveConcurrency(max_concurrency, min_concurrency)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._paused_until = 0.0
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """Wait for a concurrency slot and enough request and token budget"""
+        started = time.perf_counter()
+        LLM_QUEUE_DEPTH.inc()
+        try:
+            await self.concurrency.acquire()
+            try:
+                # A Retry-After from the provider pauses every caller, not just the one that got it
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    await asyncio.sleep(pause)
+                await self.requests.acquire(1)
+                await self.tokens.acquire(estimated_tokens)
+            except BaseException:
+                await self.concurrency.release()
+                raise
+        finally:
+            LLM_QUEUE_DEPTH.dec()
+            LLM_QUEUE_WAIT.observe(time.perf_counter() - started)
+
+    async def release(self, error: Optional[BaseException] = None) -> None:
+        await self.concurrency.release(overloaded=error is not None and classify_error(error) is not None)
+
+    def settle(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        if actual_tokens:
+            self.tokens.adjust(actual_tokens - estimated_tokens)
+
+    def retry_delay(self, error: BaseException, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying, or None when the error should propagate"""
+        reason = classify_error(error)
+        if reason is None or attempt >= self.max_retries:
+            return None
+        # Full jitter spreads retries of concurrent callers apart
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        requested = retry_after_seconds(error)
+        if requested is not None:
+            delay = max(delay, requested)
+            self._paused_until = max(self._paused_until, time.monotonic() + requested)
+        LLM_RETRIES.labels(reason=reason).inc()
+        logger.warning(f"Model call failed ({reason}), retry {attempt + 1} in {delay:.2f}s: {str(error)}")
+        return delay
+
+def _result_tokens(result: ChatResult) -> Optional[int]:
+    usage = (result.llm_output or {}).get("token_usage") or {}
+    if usage.get("total_tokens"):
+        return usage["total_tokens"]
+    metadata = getattr(result.generations[0].message, "usage_metadata", None) if result.generations else None
+    return (metadata or {}).get("total_tokens")
+
+class RateLimitedChatModel(BaseChatModel):
+    """
+    Chat model wrapper that sends every call through an LLMRateLimiter.
+
+    Failed calls are retried with jittered backoff; a streamed call is only
+    retried before its first chunk, so no token is ever delivered twice.
+    """
+
+    model: BaseChatModel
+    limiter: Any
+    completion_token_estimate: int = 500
+
+    @property
+    def _llm_type(self) -> str:
+        return f"rate-limited-{self.model._llm_type}"
+
+    def _combine_llm_outputs(self, llm_outputs: List[Optional[dict]]) -> dict:
+        return self.model._combine_llm_outputs(llm_outputs)
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> Runnable[LanguageModelInput, BaseMessage]:
+        # Tools are formatted by the wrapped model but bound here, so tool calls still pass the limiter
+        return self.bind(**self.model.bind_tools(tools, **kwargs).kwargs)
+
+    def _estimate(self, messages: List[BaseMessage]) -> int:
+        prompt = "".join(str(message.content) for message in messages)
+        return estimate_tokens(prompt) + self.completion_token_estimate
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        # The limiter is asyncio-based; the workflow only makes async calls
+        return self.model._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        return self.model._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        estimated = self._estimate(messages)
+        attempt = 0
+        while True:
+            await self.limiter.acquire(estimated)
+            try:
+                result = await self.model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+            except Exception as e:
+                await self.limiter.release(e)
+                delay = self.limiter.retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                await self.limiter.release()
+                raise
+            await self.limiter.release()
+            self.limiter.settle(estimated, _result_tokens(result))
+            return result
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        estimated = self._estimate(messages)
+        attempt = 0
+        while True:
+            await self.limiter.acquire(estimated)
+            stream = self.model._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+            try:
+                first = await stream.__anext__()
+            except StopAsyncIteration:
+                await self.limiter.release()
+                return
+            except Exception as e:
+                await self.limiter.release(e)
+                delay = self.limiter.retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                await self.limiter.release()
+                raise
+            break
+
+        error: Optional[BaseException] = None
+        actual: Optional[int] = None
+        try:
+            chunk = first
+            while True:
+                # Providers report usage on the final chunk
+                metadata = getattr(chunk.message, "usage_metadata", None)
+                if metadata:
+                    actual = (actual or 0) + metadata.get("total_tokens", 0)
+                yield chunk
+                try:
+                    chunk = await stream.__anext__()
+                except StopAsyncIteration:
+                    break
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            # Closed early when the caller was cancelled: end the provider's stream (and its request) now
+            await stream.aclose()
+            await self.limiter.release(error)
+            if error is None:
+                self.limiter.settle(estimated, actual)
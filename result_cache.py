@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import aiosqlite
+
+from app.nodes.prompts import PROMPT_VERSION
+from app.utils.config import Config
+
+logger = logging.getLogger(__name__)
+
+def normalize_resume_text(text: str) -> str:
+    """Normalize whitespace so trivially different submissions share a cache entry"""
+    return "\n".join(" ".join(line.split()) for line in text.strip().splitlines() if line.strip())
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+def analysis_cache_key(resume_text: str) -> str:
+    """Key for a full analysis: normalized resume text plus backend, model and prompt version"""
+    return _digest(
+        normalize_resume_text(resume_text),
+        Config.LLM_BACKEND,
+        Config.MODEL_NAME,
+        PROMPT_VERSION,
+        Config.EXTRACTION_MODE,
+        f"fast_path={Config.FAST_PATH_ENABLED}:{Config.FAST_PATH_MIN_CONFIDENCE}",
+        f"chunks={Config.EXTRACTION_CHUNK_TOKENS}:summary={Config.SUMMARY_CONTEXT_TOKENS}",
+        f"first_question={Config.FIRST_QUESTION_FAST_PATH}"
+    )
+
+def node_cache_key(chain_name: str, inputs: Dict[str, Any]) -> str:
+    """Key for a single node call: the chain and the exact prompt inputs it receives"""
+    return _digest(
+        chain_name,
+        json.dumps(inputs, sort_keys=True, default=str),
+        Config.LLM_BACKEND,
+        Config.MODEL_NAME,
+        PROMPT_VERSION
+    )
+
+class LRUCache:
+    """In-memory LRU tier with size and TTL eviction"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+class SQLiteCache:
+    """Persistent tier: JSON values in a SQLite table shared by all workers, expired on read"""
+
+    def __init__(self, path: str, table: str, ttl_seconds: float):
+        self.path = path
+        self.table = table
+        self.ttl_seconds = ttl_seconds
+        self._conn: Optional[aiosqlite.Connection] = None
+        self._lock = asyncio.Lock()
+
+    async def _connection(self) -> aiosqlite.Connection:
+        async with self._lock:
+            if self._conn is None:
+                conn = await aiosqlite.connect(self.path)
+                # Every worker process opens the same file; wait for its lock instead of failing
+                await conn.execute(f"PRAGMA busy_timeout={int(Config.CHECKPOINT_BUSY_TIMEOUT_MS)}")
+                await conn.execute("PRAGMA journal_mode=WAL")
+                await conn.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                await conn.commit()
+                self._conn = conn
+            return self._conn
+
+    async def get(self, key: str) -> Optional[Any]:
+        conn = await self._connection()
+        async with conn.execute(
+            f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row is None:
+            return None
+        if row[1] + self.ttl_seconds < time.time():
+            await conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            await conn.commit()
+            return None
+        return json.loads(row[0])
+
+    async def set(self, key: str, value: Any) -> None:
+        conn = await self._connection()
+        await conn.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, created_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time())
+        )
+        await conn.commit()
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._conn is not None:
+                await self._conn.close()
+                self._conn = None
+
+class ResultCache:
+    """Two-tier cache: LRU in memory, backed by SQLite; persistent hits are promoted"""
+
+    def __init__(self, memory: LRUCache, persistent: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.persistent = persistent
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None or self.persistent is None:
+            return value
+        try:
+            value = await self.persistent.get(key)
+        except Exception as e:
+            logger.warning(f"Persistent cache read failed: {str(e)}")
+            return None
+        if value is not None:
+            self.memory.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any) -> None:
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            try:
+                await self.persistent.set(key, value)
+            except Exception as e:
+                logger.warning(f"Persistent cache write failed: {str(e)}")
+
+    async def close(self) -> None:
+        if self.persistent is not None:
+            await self.persistent.close()
+
+def _build_cache(table: str) -> ResultCache:
+    persistent = (
+        SQLiteCache(Config.RESULT_CACHE_DB_PATH, table, Config.RESULT_CACHE_TTL_SECONDS)
+        if Config.RESULT_CACHE_DB_PATH else None
+    )
+    return ResultCache(
+        LRUCache(Config.RESULT_CACHE_MAX_ENTRIES, Config.RESULT_CACHE_TTL_SECONDS),
+        persistent
+    )
+
+# Whole-analysis results keyed by resume content, and single node results keyed by prompt inputs
+analysis_cache = _build_cache("analysis_results")
+node_cache = _build_cache("node_results")
@@ -0,0 +1,116 @@
+import re
+from typing import Any, Dict, Iterable, List, Tuple
+
+from app.nodes.resume_sections import BULLET, section_for
+from app.utils.tokenizer import count_tokens, truncate_to_tokens
+
+def _entries(block: str) -> List[str]:
+    """
+    Split a block at entry boundaries: a non-bullet line that follows
+    bullets starts the next entry ('Role | Company | dates' after the
+    previous role's achievements).
+    """
+    entries: List[List[str]] = []
+    has_bullets = False
+    for line in block.splitlines():
+        bullet = bool(BULLET.match(line))
+        if not entries or (has_bullets and not bullet and line.strip()):
+            entries.append([])
+            has_bullets = False
+        entries[-1].append(line)
+        has_bullets = has_bullets or bullet
+    return ["\n".join(lines) for lines in entries]
+
+def _pieces(text: str, max_tokens: int) -> List[Tuple[str, str]]:
+    """(section header, piece) pairs, each piece an entry that fits the budget"""
+    pieces: List[Tuple[str, str]] = []
+    header = ""
+    for block in re.split(r"\n\s*\n", text.strip()):
+        lines = block.strip().splitlines()
+        if lines and section_for(lines[0]):
+            header = lines[0].strip()
+            lines = lines[1:]
+        if not lines:
+            continue
+        for entry in _entries("\n".join(lines)):
+            # An entry longer than the budget on its own is split at line, then token, boundaries
+            while count_tokens(entry) > max_tokens:
+                head = truncate_to_tokens(entry, max_tokens)
+                pieces.append((header, head))
+                entry = entry[len(head):].strip()
+            if entry:
+                pieces.append((header, entry))
+    return pieces
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Split routed resume text into chunks of at most about max_tokens.
+
+    Chunks break between sections or between entries, never inside an
+    entry that fits the budget, and each chunk starts with the header of
+    its section so the extractor knows what it is reading. Text within
+    the budget (or a budget of 0) is returned as a single chunk.
+    """
+    if max_tokens <= 0 or count_tokens(text) <= max_tokens:
+        return [text]
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_header = None
+    used = 0
+    for header, piece in _pieces(text, max_tokens):
+        tokens = count_tokens(piece)
+        if current and used + tokens > max_tokens:
+            chunks.append("\n\n".join(current))
+            current, current_header, used = [], None, 0
+        if header and header != current_header:
+            current.append(header)
+            current_header = header
+            used += count_tokens(header)
+        current.append(piece)
+        used += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+def _normalize(value: Any) -> str:
+    return re.sub(r"[^a-z0-9]", "", str(value or "").lower())
+
+def _merge(entries: Iterable[Dict[str, Any]], key_fields: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    """
+    De-duplicate entries extracted from overlapping or repeated chunks.
+
+    Entries with the same normalized key fields are one entry; the copy
+    with the longest description wins and fills fields the other lacks.
+    """
+    merged: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+    for entry in entries:
+        key = tuple(_normalize(entry.get(name)) for name in key_fields)
+        kept = merged.get(key)
+        if kept is None:
+            merged[key] = dict(entry)
+            continue
+        if len(str(entry.get("description") or "")) > len(str(kept.get("description") or "")):
+            kept, entry = dict(entry), kept
+            merged[key] = kept
+        for name, value in entry.items():
+            if kept.get(name) in (None, "") and value not in (None, ""):
+                kept[name] = value
+    return list(merged.values())
+
+def merge_work_experiences(entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return _merge(entries, ("company", "role", "start_date"))
+
+def merge_education(entries: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return _merge(entries, ("institution", "degree", "field", "start_year"))
+
+def merge_skills(skills: Iterable[str]) -> List[str]:
+    """Skills in first-seen order, ignoring case and punctuation differences"""
+    seen = set()
+    merged = []
+    for skill in skills:
+        key = _normalize(skill)
+        if key and key not in seen:
+            seen.add(key)
+            merged.append(skill)
+    return merged
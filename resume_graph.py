@@ -1,59 +1,79 @@
-import sqlite3
-import uuid
-from typing import Dict, Any, Literal
+import asyncio
+import logging
+from typing import Dict, Any, List, Literal, Optional, Union
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.sqlite import SqliteSaver
 from langgraph.graph.message import add_messages
 
 from app.models.resume_models import GraphState
 from app.nodes.workflow_nodes import (
-    start_node, extract_work_experience, extract_education,
-    generate_summary, extract_insights, generate_questions, end_node
+    start_node, extract_work_experience, extract_education, extract_resume_data,
+    merge_extractions, generate_summary, generate_first_question, extract_insights,
+    generate_questions, end_node
 )
+from app.utils.checkpointer import get_checkpointer
+from app.utils.config import Config
+from app.utils.routing import new_thread_id
 
-# Initialize SQLite checkpoint saver
-def get_checkpointer():
-    conn = sqlite3.connect("checkpoints.db", check_same_thread=False)
-    return SqliteSaver(conn)
+logger = logging.getLogger(__name__)
 
-def should_continue(state: Dict[str, Any]) -> Literal["extract_education", "end"]:
-    """Conditional logic for workflow routing"""
+def should_continue(state: Dict[str, Any]) -> Union[Literal["generate_summary", "end"], List[str]]:
+    """Conditional logic for workflow routing after the extraction join"""
     if state.get("error"):
         return "end"
-    return "extract_education"
+    if Config.FIRST_QUESTION_FAST_PATH:
+        # Both branches run in the same step; the first question streams as soon as it is ready
+        return ["generate_summary", "generate_first_question"]
+    return "generate_summary"
 
 def create_resume_workflow():
     """Create and return the resume analysis workflow graph"""
     
     # Create workflow with type annotations
-    workflow = StateGraph(dict)
+    workflow = StateGraph(GraphState)
     
     # Add all nodes
     workflow.add_node("start", start_node)
-    workflow.add_node("extract_work", extract_work_experience)
-    workflow.add_node("extract_education", extract_education)
+    if Config.EXTRACTION_MODE == "combined":
+        workflow.add_node("extract_resume_data", extract_resume_data)
+    else:
+        workflow.add_node("extract_work", extract_work_experience)
+        workflow.add_node("extract_education", extract_education)
+    workflow.add_node("merge_extractions", merge_extractions)
     workflow.add_node("generate_summary", generate_summary)
+    if Config.FIRST_QUESTION_FAST_PATH:
+        workflow.add_node("generate_first_question", generate_first_question)
     workflow.add_node("extract_insights", extract_insights)
     workflow.add_node("generate_questions", generate_questions)
     workflow.add_node("end", end_node)
     
-    # Define the workflow edges
-    workflow.add_edge("start", "extract_work")
-    workflow.add_conditional_edges(
-        "extract_work",
-        should_continue,
-        {
-            "extract_education": "extract_education",
-            "end": "end"
-        }
-    )
-    workflow.add_edge("extract_education", "generate_summary")
+    # Define the workflow edges: the separate extractions only read raw_text,
+    # so they run in parallel and join before the summary
+    if Config.EXTRACTION_MODE == "combined":
+        workflow.add_edge("start", "extract_resume_data")
+        workflow.add_edge("extract_resume_data", "merge_extractions")
+    else:
+        workflow.add_edge("start", "extract_work")
+        workflow.add_edge("start", "extract_education")
+        workflow.add_edge(["extract_work", "extract_education"], "merge_extractions")
+    branches = {
+        "generate_summary": "generate_summary",
+        "end": "end"
+    }
+    if Config.FIRST_QUESTION_FAST_PATH:
+        branches["generate_first_question"] = "generate_first_question"
+    workflow.add_conditional_edges("merge_extractions", should_continue, branches)
+    if Config.FIRST_QUESTION_FAST_PATH:
+        # A dead-end branch rather than a join before end: end_node reads the
+        # question from state, and a resume at generate_questions has no
+        # fast-path run to wait for
+        workflow.add_edge("generate_first_question", END)
     workflow.add_edge("generate_summary", "extract_insights")
     workflow.add_edge("extract_insights", "generate_questions")
     workflow.add_edge("generate_questions", "end")
     
-    # Set entry point
+    # Set entry and finish points
     workflow.set_entry_point("start")
+    workflow.set_finish_point("end")
     
     # Compile with checkpointing
     checkpointer = get_checkpointer()
@@ -64,24 +84,99 @@ def create_resume_workflow():
 # Global workflow instance
 resume_workflow = create_resume_workflow()
 
+def create_initial_state(resume_text: str) -> Dict[str, Any]:
+    """Initial workflow state for a resume"""
+    return {
+        "raw_text": resume_text,
+        "work_experiences": [],
+        "education": [],
+        "summary": "",
+        "insights": [],
+        "questions": [],
+        "current_node": "start",
+        "error": None
+    }
+
 def generate_thread_id() -> str:
     """Generate a unique thread ID for checkpointing"""
-    return f"thread_{uuid.uuid4().hex[:8]}"
+    return new_thread_id()
+
+class CheckpointBusyError(RuntimeError):
+    """A checkpoint's analysis has not finished, or another worker is running it"""
+
+def run_lease_name(thread_id: str) -> str:
+    """Checkpoint store lease held by the worker running a thread"""
+    return f"run:{thread_id}"
+
+async def keep_run_lease(thread_id: str) -> None:
+    """Renew the lease on a running thread until cancelled"""
+    while True:
+        await asyncio.sleep(Config.STREAM_LEASE_SECONDS / 3)
+        try:
+            if not await resume_workflow.checkpointer.acquire_lease(run_lease_name(thread_id), Config.STREAM_LEASE_SECONDS):
+                logger.warning(f"Lost the lease on thread {thread_id} to another worker")
+                return
+        except Exception as e:
+            logger.error(f"Renewing the lease on thread {thread_id} failed: {str(e)}")
+
+async def release_run_lease(thread_id: str) -> None:
+    try:
+        await resume_workflow.checkpointer.release_lease(run_lease_name(thread_id))
+    except Exception as e:
+        logger.error(f"Releasing the lease on thread {thread_id} failed: {str(e)}")
+
+# Node whose completion leads directly to each resumable node
+RESUME_AFTER = {
+    "generate_summary": "merge_extractions",
+    "extract_insights": "generate_summary",
+    "generate_questions": "extract_insights"
+}
 
-def resume_from_checkpoint(checkpoint_id: str, target_node: str = "generate_questions"):
-    """Resume workflow from a specific checkpoint and node"""
+async def resume_from_checkpoint(
+    checkpoint_id: str,
+    target_node: str = "generate_questions",
+    updates: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Resume workflow from a specific checkpoint and node.
+    
+    The saved state (with `updates` applied) is recorded as if the node
+    before `target_node` had just completed, so only `target_node` and the
+    nodes after it run. Returns the final state.
+    
+    Raises ValueError when there is no such checkpoint, and
+    CheckpointBusyError when its analysis has not finished or another
+    worker holds the thread's run lease.
+    """
     config = {"configurable": {"thread_id": checkpoint_id}}
     
     # Get the current state from checkpoint
     try:
-        state_snapshot = resume_workflow.get_state(config)
-        if not state_snapshot:
-            raise ValueError(f"No checkpoint found for ID: {checkpoint_id}")
-        
-        # Update state to resume from target node
-        current_state = state_snapshot.values
-        current_state["current_node"] = target_node
-        
-        return current_state, config
+        state_snapshot = await resume_workflow.aget_state(config)
     except Exception as e:
-        raise ValueError(f"Failed to resume from checkpoint {checkpoint_id}: {str(e)}")
\ No newline at end of file
+        raise ValueError(f"Failed to resume from checkpoint {checkpoint_id}: {str(e)}")
+    if not state_snapshot.values:
+        raise ValueError(f"No checkpoint found for ID: {checkpoint_id}")
+    if target_node not in RESUME_AFTER:
+        raise ValueError(f"Cannot resume at node: {target_node}")
+    # Resuming a run that is still going (or was stopped midway) would fork a second run beside it
+    if state_snapshot.next:
+        raise CheckpointBusyError(f"Analysis for checkpoint {checkpoint_id} has not finished")
+    if not await resume_workflow.checkpointer.acquire_lease(run_lease_name(checkpoint_id), Config.STREAM_LEASE_SECONDS):
+        raise CheckpointBusyError(f"Checkpoint {checkpoint_id} is in use by another worker")
+    
+    keep_lease = asyncio.create_task(keep_run_lease(checkpoint_id))
+    try:
+        # A previous failure must not stop the resumed run, and the earlier run's
+        # fast-path question must not lead the questions this run generates
+        await resume_workflow.aupdate_state(
+            config,
+            {**(updates or {}), "error": None, "first_question": "", "current_node": RESUME_AFTER[target_node]},
+            as_node=RESUME_AFTER[target_node]
+        )
+        
+        # No new input: continue from the updated checkpoint
+        return await resume_workflow.ainvoke(None, config)
+    finally:
+        keep_lease.cancel()
+        await release_run_lease(checkpoint_id)
\ No newline at end of file
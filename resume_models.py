@@ -1,5 +1,7 @@
+import operator
 from pydantic import BaseModel, Field, validator
 from typing import Optional, List, Dict, Any
+from typing_extensions import Annotated, TypedDict
 from datetime import datetime
 
 class WorkExperience(BaseModel):
@@ -19,6 +21,7 @@ class WorkExperience(BaseModel):
         return v
 
 class WorkExperienceList(BaseModel):
+    """Work experience entries found in the resume"""
     work_experiences: List[WorkExperience] = Field(default_factory=list)
 
 class Education(BaseModel):
@@ -35,27 +38,52 @@ class Education(BaseModel):
         return v
 
 class EducationList(BaseModel):
+    """Education entries found in the resume"""
     education: List[Education] = Field(default_factory=list)
 
+class ResumeExtraction(WorkExperienceList, EducationList):
+    """Work experience, education and skills extracted in a single call"""
+    skills: List[str] = Field(default_factory=list)
+
 class ResumeInsights(BaseModel):
+    """Key professional insights about the candidate"""
     insights: List[str] = Field(..., min_items=1)
 
+class InterviewQuestion(BaseModel):
+    """A first interview question, asked before the full set is ready"""
+    question: str = Field(..., min_length=1)
+
 class InterviewQuestions(BaseModel):
+    """Interview questions tailored to the candidate"""
     questions: List[str] = Field(..., min_items=1)
 
-class GraphState(BaseModel):
-    """State for LangGraph workflow"""
-    raw_text: str = ""
-    work_experiences: List[WorkExperience] = Field(default_factory=list)
-    education: List[Education] = Field(default_factory=list)
-    summary: str = ""
-    insights: List[str] = Field(default_factory=list)
-    questions: List[str] = Field(default_factory=list)
-    current_node: str = "start"
-    error: Optional[str] = None
+def merge_unique(left: List[str], right: List[str]) -> List[str]:
+    """Reducer that appends new entries, ignoring ones already present"""
+    return (left or []) + [item for item in (right or []) if item not in (left or [])]
+
+class GraphState(TypedDict, total=False):
+    """
+    State for LangGraph workflow.
     
-    class Config:
-        arbitrary_types_allowed = True
+    Nodes return only the keys they change. Keys without a reducer keep
+    the last value written; each of them has a single writer per step.
+    """
+    raw_text: str
+    work_experiences: List[Dict[str, Any]]
+    education: List[Dict[str, Any]]
+    skills: List[str]
+    summary: str
+    insights: List[str]
+    questions: List[str]
+    # Fast-path question generated next to the summary; end puts it first in questions
+    first_question: str
+    current_node: str
+    error: Optional[str]
+    # Written by the parallel extraction branches, so it needs a reducer
+    extraction_errors: Annotated[List[str], merge_unique]
+    # Set by any node that replaced model output with defaults; such results are not cached.
+    # Optional so the channel has no default value and an unknown thread's state stays empty
+    degraded: Annotated[Optional[bool], operator.or_]
 
 # API Models
 class ResumeAnalysisRequest(BaseModel):
@@ -67,6 +95,8 @@ class CheckpointResumeRequest(BaseModel):
     summary: Optional[str] = None
 
 class StreamResponse(BaseModel):
-    type: str  # 'summary', 'question', 'complete', 'error'
+    type: str  # 'summary', 'question', 'complete', 'error'; job events add 'status', 'progress'
     content: str
-    checkpoint_id: Optional[str] = None
\ No newline at end of file
+    checkpoint_id: Optional[str] = None
+    # SSE event ID, sent as the frame's `id:` field rather than in the payload
+    id: Optional[str] = Field(default=None, exclude=True)
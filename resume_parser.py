@@ -0,0 +1,171 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from app.models.resume_models import Education, WorkExperience
+from app.nodes.resume_sections import BULLET, CAPS_HEADER
+
+MONTHS = {
+    name: index for index, names in enumerate([
+        ("jan", "january"), ("feb", "february"), ("mar", "march"), ("apr", "april"),
+        ("may",), ("jun", "june"), ("jul", "july"), ("aug", "august"),
+        ("sep", "sept", "september"), ("oct", "october"), ("nov", "november"), ("dec", "december")
+    ], 1) for name in names
+}
+
+DATE = r"(?:\d{4}-\d{1,2}|\d{1,2}/\d{4}|[A-Za-z]{3,9}\.? \d{4}|\d{4})"
+DATE_RANGE = re.compile(
+    rf"^(?P<start>{DATE})\s*(?:to|-|–|—)\s*(?P<end>{DATE}|present|current|now)$",
+    re.IGNORECASE
+)
+YEAR_RANGE = re.compile(r"^(?P<start>\d{4})\s*(?:to|-|–|—)\s*(?P<end>\d{4})$")
+YEAR = re.compile(r"\b(?:19|20)\d{2}\b")
+DEGREE_OF = re.compile(r"^(?:bachelor|master|doctor|associate)(?:'s)? of (?P<field>.+)$", re.IGNORECASE)
+
+# Each inferred value (a month, a field, a description) lowers an entry's score by this factor
+INFERENCE_PENALTY = 0.9
+
+# A skill longer than this is more likely a sentence than a skill
+MAX_SKILL_WORDS = 4
+
+@dataclass
+class ParsedSection:
+    """Entries read from one resume section, with how much the parser trusts them"""
+    entries: list = field(default_factory=list)
+    confidence: float = 0.0
+
+def normalize_date(value: str) -> Tuple[Optional[str], bool]:
+    """YYYY-MM (or 'Present') for a resume date, and whether the month had to be guessed"""
+    value = value.strip().rstrip(".")
+    if value.lower() in ("present", "current", "now"):
+        return "Present", False
+    match = re.match(r"^(\d{4})-(\d{1,2})$", value)
+    if match:
+        return f"{match.group(1)}-{int(match.group(2)):02d}", False
+    match = re.match(r"^(\d{1,2})/(\d{4})$", value)
+    if match:
+        return f"{match.group(2)}-{int(match.group(1)):02d}", False
+    match = re.match(r"^([A-Za-z]+)\.? (\d{4})$", value)
+    if match and match.group(1).lower() in MONTHS:
+        return f"{match.group(2)}-{MONTHS[match.group(1).lower()]:02d}", False
+    if re.match(r"^\d{4}$", value):
+        return f"{value}-01", True
+    return None, False
+
+def _split_entry(line: str) -> Optional[List[str]]:
+    parts = [part.strip() for part in line.split("|")]
+    if len(parts) != 3 or not all(parts):
+        return None
+    return parts
+
+def _confidence(scores: List[float], parsed_lines: int, unparsed_lines: int) -> float:
+    """Weakest entry score, scaled by the share of entry-like lines that parsed"""
+    if not scores:
+        return 0.0
+    return min(scores) * parsed_lines / (parsed_lines + unparsed_lines)
+
+def parse_work_experience(section: Optional[str]) -> ParsedSection:
+    """Read `Role | Company | 2021-01 to Present` entries and their bullets from a segmented section"""
+    if not section:
+        return ParsedSection()
+    lines = section.splitlines()
+
+    entries: List[Dict[str, str]] = []
+    scores: List[float] = []
+    unparsed = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        parts = _split_entry(line)
+        dates = DATE_RANGE.match(parts[2]) if parts else None
+        if dates:
+            start, start_guessed = normalize_date(dates.group("start"))
+            end, end_guessed = normalize_date(dates.group("end"))
+            entries.append({"role": parts[0], "company": parts[1], "start_date": start, "end_date": end,
+                            "description": []})
+            scores.append(INFERENCE_PENALTY ** (start_guessed + end_guessed))
+        elif entries and (BULLET.match(line) or not YEAR.search(line)):
+            # Bullets and plain lines after an entry describe it; a plain line may
+            # also be text from another section, so it counts against confidence
+            entries[-1]["description"].append(BULLET.sub("", line).strip())
+            if not BULLET.match(line):
+                unparsed += 1
+        else:
+            # Possibly an entry in a layout the parser does not know
+            unparsed += 1
+
+    experiences = []
+    for index, entry in enumerate(entries):
+        description = "; ".join(entry["description"])
+        if not description:
+            description = f"{entry['role']} at {entry['company']}"
+            scores[index] *= INFERENCE_PENALTY
+        try:
+            experiences.append(WorkExperience(**{**entry, "description": description}))
+        except ValidationError:
+            return ParsedSection()
+    return ParsedSection(experiences, _confidence(scores, len(entries), unparsed))
+
+def parse_education(section: Optional[str]) -> ParsedSection:
+    """Read `Degree in Field | Institution | 2014 to 2018` entries from a segmented section"""
+    if not section:
+        return ParsedSection()
+    lines = section.splitlines()
+
+    education = []
+    scores: List[float] = []
+    unparsed = 0
+    for line in lines:
+        if not line.strip() or BULLET.match(line):
+            # Honours and coursework bullets are not part of the schema
+            continue
+        parts = _split_entry(line)
+        years = YEAR_RANGE.match(parts[2]) if parts else None
+        if not years:
+            unparsed += 1
+            continue
+
+        score = 1.0
+        degree, _, field_name = parts[0].partition(" in ")
+        if not field_name:
+            # "Master of Business Administration" names its own field
+            degree_of = DEGREE_OF.match(parts[0])
+            field_name = degree_of.group("field") if degree_of else parts[0]
+            score *= INFERENCE_PENALTY if degree_of else INFERENCE_PENALTY ** 3
+        try:
+            education.append(Education(
+                degree=degree.strip(),
+                field=field_name.strip(),
+                institution=parts[1],
+                start_year=int(years.group("start")),
+                end_year=int(years.group("end"))
+            ))
+        except ValidationError:
+            return ParsedSection()
+        scores.append(score)
+    return ParsedSection(education, _confidence(scores, len(education), unparsed))
+
+def parse_skills(section: Optional[str]) -> ParsedSection:
+    """Read comma-separated skill lists, optionally labelled ('Tools: Git, Docker')"""
+    if not section:
+        return ParsedSection()
+    lines = section.splitlines()
+
+    skills: List[str] = []
+    unparsed = 0
+    for line in lines:
+        line = BULLET.sub("", line).strip()
+        if ":" in line:
+            line = line.split(":", 1)[1]
+        for skill in re.split(r"[,;]", line):
+            skill = skill.strip().rstrip(".")
+            if not skill or skill in skills:
+                continue
+            skills.append(skill)
+            # A header or a sentence is likely text from another section
+            if (len(skill) > 4 and CAPS_HEADER.match(skill)) or len(skill.split()) > MAX_SKILL_WORDS:
+                unparsed += 1
+    scores = [1.0] if skills else []
+    return ParsedSection(skills, _confidence(scores, len(skills) - unparsed, unparsed))
@@ -0,0 +1,106 @@
+import re
+from typing import Dict, Optional, Tuple
+
+# Canonical section names and the headers that introduce them
+SECTION_HEADERS: Dict[str, Tuple[str, ...]] = {
+    "contact": ("CONTACT", "CONTACT INFORMATION", "CONTACT DETAILS", "PERSONAL DETAILS"),
+    "summary": (
+        "SUMMARY", "PROFESSIONAL SUMMARY", "CAREER SUMMARY", "EXECUTIVE SUMMARY", "PROFILE",
+        "PROFESSIONAL PROFILE", "OBJECTIVE", "CAREER OBJECTIVE", "ABOUT", "ABOUT ME"
+    ),
+    "experience": (
+        "WORK EXPERIENCE", "PROFESSIONAL EXPERIENCE", "EXPERIENCE", "RELEVANT EXPERIENCE",
+        "EMPLOYMENT", "EMPLOYMENT HISTORY", "WORK HISTORY", "CAREER HISTORY"
+    ),
+    "education": (
+        "EDUCATION", "ACADEMIC BACKGROUND", "ACADEMIC HISTORY", "EDUCATION AND TRAINING",
+        "EDUCATIONAL BACKGROUND"
+    ),
+    "skills": (
+        "SKILLS", "TECHNICAL SKILLS", "CORE SKILLS", "KEY SKILLS", "CORE COMPETENCIES",
+        "COMPETENCIES", "SKILLS AND TOOLS"
+    ),
+    "projects": ("PROJECTS", "KEY PROJECTS", "SELECTED PROJECTS", "PERSONAL PROJECTS"),
+    # Sections no chain reads; their text is dropped
+    "other": (
+        "AWARDS", "HONORS", "HONORS AND AWARDS", "ACHIEVEMENTS", "CERTIFICATIONS", "CERTIFICATES",
+        "LICENSES", "LANGUAGES", "INTERESTS", "HOBBIES", "HOBBIES AND INTERESTS", "PUBLICATIONS",
+        "VOLUNTEER", "VOLUNTEERING", "VOLUNTEER EXPERIENCE", "REFERENCES", "ACTIVITIES"
+    ),
+}
+HEADER_SECTIONS = {header: name for name, headers in SECTION_HEADERS.items() for header in headers}
+
+# Sections each chain reads, in the order they are passed to the prompt
+NODE_SECTIONS: Dict[str, Tuple[str, ...]] = {
+    "work_experience": ("experience",),
+    "education": ("education",),
+    "resume_extraction": ("experience", "education", "skills"),
+    "summary": ("contact", "summary", "experience", "skills", "projects"),
+}
+
+BULLET = re.compile(r"^\s*[-•*▪–]\s*")
+
+# A line set like a header: up to four all-caps words, optionally ending in a colon
+CAPS_HEADER = re.compile(r"^[A-Z][A-Z&/ ]{2,40}:?$")
+
+def _header_text(line: str) -> str:
+    return line.strip().rstrip(":").strip().upper()
+
+def section_for(line: str) -> Optional[str]:
+    """Section a known header line opens, also in title case ('Work Experience')"""
+    return HEADER_SECTIONS.get(_header_text(line))
+
+def _unknown_header(line: str, previous: str) -> bool:
+    """
+    Whether an all-caps line is a header this module does not know
+    ('ACCOMPLISHMENTS'). Only a line set off by a blank line counts: a
+    caps line inside a block is as likely to be an employer ('IBM') or a
+    skill ('PYTHON').
+    """
+    text = line.strip()
+    return not previous.strip() and bool(CAPS_HEADER.match(text)) and len(text.split()) <= 4
+
+def segment_resume(text: str) -> Dict[str, str]:
+    """
+    Split a resume into contact, summary, experience, education, skills
+    and projects sections by their headers.
+
+    Text before the first recognized header (name, title, contact line)
+    is the contact section. Any other header (awards, languages, an
+    all-caps header after a blank line) ends the section above it and
+    its text is dropped, so it is not parsed as experience or skills.
+    Repeated sections are concatenated.
+    """
+    sections: Dict[str, list] = {}
+    current = "contact"
+    previous = ""
+    for index, line in enumerate(text.strip().splitlines()):
+        name = section_for(line) or ("other" if index and _unknown_header(line, previous) else None)
+        previous = line
+        if name:
+            current = name
+            continue
+        sections.setdefault(current, []).append(line.rstrip())
+
+    return {
+        name: "\n".join(lines).strip()
+        for name, lines in sections.items()
+        if name != "other" and "\n".join(lines).strip()
+    }
+
+def route_text(sections: Dict[str, str], chain_name: str, raw_text: str) -> str:
+    """
+    Text a chain should see: only its sections, each under its header.
+
+    Falls back to the whole resume when none of the sections were found,
+    so unusual layouts are still extracted.
+    """
+    parts = [
+        f"{name.upper()}\n{sections[name]}"
+        for name in NODE_SECTIONS[chain_name]
+        if sections.get(name)
+    ]
+    wanted = [name for name in NODE_SECTIONS[chain_name] if name != "contact"]
+    if not any(sections.get(name) for name in wanted):
+        return raw_text
+    return "\n\n".join(parts)
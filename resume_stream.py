@@ -0,0 +1,338 @@
+import asyncio
+import logging
+from typing import Callable, Dict, Any, AsyncGenerator, List, Optional
+
+from langchain.callbacks.base import AsyncCallbackHandler
+
+from app.models.resume_models import StreamResponse
+from app.nodes.prompts import SUMMARY_STREAM_TAG
+from app.utils.config import Config
+from app.utils.metrics import RUN_CANCELLATIONS
+from app.utils.result_cache import analysis_cache, analysis_cache_key
+from app.utils.single_flight import Flight, SingleFlight
+from app.utils.sse import START, Position, advance, event_id, event_position, parse_event_id, received
+from app.workflow.resume_graph import keep_run_lease, release_run_lease, resume_workflow, run_lease_name
+
+logger = logging.getLogger(__name__)
+
+# State keys that make up a finished analysis and are worth caching
+CACHED_STATE_KEYS = (
+    "work_experiences", "education", "skills", "summary", "insights", "questions", "first_question"
+)
+
+def _stop_relay(flight: Flight[StreamResponse]) -> None:
+    # Only forwards a thread's events; the thread's own flight applies the disconnect policy
+    if flight.task is not None:
+        flight.task.cancel()
+
+def _on_clients_gone(flight: Flight[StreamResponse]) -> None:
+    """Every client of a running analysis disconnected: apply STREAM_DISCONNECT_POLICY"""
+    if flight.events and flight.events[-1].type in ("complete", "error"):
+        return
+    if Config.STREAM_DISCONNECT_POLICY == "cancel" and flight.task is not None:
+        # Cancels the graph and the model requests it is waiting on
+        logger.info(f"Cancelling analysis for thread {flight.key}: all clients disconnected")
+        flight.task.cancel()
+        RUN_CANCELLATIONS.labels(policy="cancel").inc()
+
+# Identical resumes submitted while an analysis is running share that analysis
+analysis_flights: SingleFlight[StreamResponse] = SingleFlight(on_idle=_stop_relay)
+
+# Running analyses by the thread executing them, so a client that reconnects can rejoin its run
+thread_flights: SingleFlight[StreamResponse] = SingleFlight(on_idle=_on_clients_gone)
+
+def _abandoned(thread_id: str) -> bool:
+    """Whether a run should stop at its next checkpoint because nobody follows it"""
+    flight = thread_flights.get(thread_id)
+    return Config.STREAM_DISCONNECT_POLICY == "checkpoint" and flight is not None and flight.abandoned
+
+def _run_thread(
+    thread_id: str,
+    initial_state: Optional[Dict[str, Any]],
+    config: Dict[str, Any]
+) -> AsyncGenerator[StreamResponse, None]:
+    return thread_flights.stream(
+        thread_id,
+        lambda: stream_resume_analysis(initial_state, config, should_stop=lambda: _abandoned(thread_id))
+    )
+
+class SummaryTokenHandler(AsyncCallbackHandler):
+    """Forwards summary tokens from the chat model to a per-request queue"""
+
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+
+    async def on_llm_new_token(self, token: str, *, tags: Optional[List[str]] = None, **kwargs: Any) -> None:
+        if token and SUMMARY_STREAM_TAG in (tags or []):
+            await self.queue.put(("token", token))
+
+async def replay_cached_analysis(
+    initial_state: Dict[str, Any],
+    cached: Dict[str, Any],
+    config: Dict[str, Any]
+) -> AsyncGenerator[StreamResponse, None]:
+    """Emit the event sequence of a finished analysis from a cached result"""
+    thread_id = config["configurable"]["thread_id"]
+
+    # Save the cached result as this thread's final state so the checkpoint ID stays usable
+    await resume_workflow.aupdate_state(
+        config,
+        {**initial_state, **cached, "current_node": "end"},
+        as_node="end"
+    )
+
+    for event in checkpoint_events(thread_id, cached, True):
+        yield event
+
+def first_question(values: Dict[str, Any]) -> Optional[str]:
+    """The question streamed for an analysis: the fast-path one, else the first of the full set"""
+    return values.get("first_question") or next(iter(values.get("questions") or []), None)
+
+def checkpoint_events(
+    thread_id: str,
+    values: Dict[str, Any],
+    finished: bool,
+    after: Position = START
+) -> List[StreamResponse]:
+    """
+    The events of an analysis that its saved state already holds and a
+    client at position `after` has not received. A summary the client has
+    partly received is sent from where it stopped.
+    """
+    events = []
+    summary = values.get("summary") or ""
+    summary_chars, question_sent, final_sent = after
+    if len(summary) > summary_chars:
+        events.append(StreamResponse(
+            type="summary",
+            content=summary[summary_chars:],
+            id=event_id(thread_id, "summary", len(summary), question_sent)
+        ))
+        summary_chars = len(summary)
+    question = first_question(values)
+    if question and not question_sent:
+        question_sent = True
+        events.append(StreamResponse(
+            type="question",
+            content=question,
+            id=event_id(thread_id, "question", summary_chars, question_sent)
+        ))
+    if final_sent:
+        return events
+    if values.get("error"):
+        events.append(StreamResponse(
+            type="error",
+            content=values["error"],
+            id=event_id(thread_id, "error", summary_chars, question_sent)
+        ))
+    elif finished:
+        events.append(StreamResponse(
+            type="complete",
+            content="Analysis completed successfully",
+            checkpoint_id=thread_id,
+            id=event_id(thread_id, "complete", summary_chars, question_sent)
+        ))
+    return events
+
+async def stream_resume_analysis(
+    initial_state: Optional[Dict[str, Any]],
+    config: Dict[str, Any],
+    should_stop: Optional[Callable[[], bool]] = None
+) -> AsyncGenerator[StreamResponse, None]:
+    """
+    Run the workflow once and yield StreamResponse events as it progresses.
+
+    Summary tokens are forwarded as they are produced by the model; question
+    and completion events follow the node updates of the graph. Every event
+    carries an ID (see app.utils.sse) a client can reconnect with. With no
+    initial state the thread continues from its last checkpoint.
+
+    should_stop is checked each time a checkpoint is saved; once it returns
+    True the run ends there without further events, and can be continued
+    from that checkpoint later.
+
+    The run holds the thread's lease (renewed every third of
+    STREAM_LEASE_SECONDS) until it ends, so a reconnect in another worker
+    follows it rather than starting a second execution.
+    """
+    thread_id = config["configurable"]["thread_id"]
+
+    cache_enabled = Config.RESULT_CACHE_ENABLED and initial_state is not None
+    cache_key = analysis_cache_key(initial_state["raw_text"]) if cache_enabled else None
+    if cache_key:
+        cached = await analysis_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Analysis cache hit for thread {thread_id}")
+            async for event in replay_cached_analysis(initial_state, cached, config):
+                yield event
+            return
+
+    if not await resume_workflow.checkpointer.acquire_lease(run_lease_name(thread_id), Config.STREAM_LEASE_SECONDS):
+        logger.warning(f"Thread {thread_id} is leased by another worker; running it here as well")
+
+    queue: asyncio.Queue = asyncio.Queue()
+    run_config = {**config, "callbacks": [SummaryTokenHandler(queue)]}
+
+    async def run_workflow():
+        # Debug output includes an event per saved checkpoint, the point where a run can stop cleanly
+        stream = resume_workflow.astream(initial_state, run_config, stream_mode=["updates", "debug"])
+        try:
+            async for mode, payload in stream:
+                if mode == "updates":
+                    await queue.put(("update", payload))
+                elif payload["type"] == "checkpoint" and should_stop is not None and should_stop():
+                    await queue.put(("stopped", payload["step"]))
+                    break
+        except Exception as e:
+            await queue.put(("failed", e))
+        finally:
+            # Closing the graph's stream waits for its checkpoint writes
+            await stream.aclose()
+            await queue.put(("done", None))
+
+    task = asyncio.create_task(run_workflow())
+    keep_lease = asyncio.create_task(keep_run_lease(thread_id))
+    summary_sent = 0
+    question_sent = False
+    try:
+        while True:
+            kind, payload = await queue.get()
+
+            if kind == "token":
+                summary_sent += len(payload)
+                yield StreamResponse(
+                    type="summary",
+                    content=payload,
+                    id=event_id(thread_id, "summary", summary_sent, question_sent)
+                )
+
+            elif kind == "update":
+                for node_name, node_state in payload.items():
+                    node_state = node_state or {}
+                    if node_state.get("error"):
+                        yield StreamResponse(
+                            type="error",
+                            content=node_state["error"],
+                            id=event_id(thread_id, "error", summary_sent, question_sent)
+                        )
+                        return
+
+                    # The fast path's question if it has one, else the first of the full set
+                    if node_name in ("generate_first_question", "generate_questions") and not question_sent:
+                        question = first_question(node_state)
+                        if question:
+                            question_sent = True
+                            yield StreamResponse(
+                                type="question",
+                                content=question,
+                                id=event_id(thread_id, "question", summary_sent, question_sent)
+                            )
+
+            elif kind == "failed":
+                raise payload
+
+            elif kind == "stopped":
+                logger.info(f"Stopped analysis for thread {thread_id} at checkpoint step {payload}: all clients disconnected")
+                RUN_CANCELLATIONS.labels(policy="checkpoint").inc()
+                await task
+                return
+
+            else:
+                break
+
+        if cache_key:
+            final_state = (await resume_workflow.aget_state(config)).values
+            if final_state.get("degraded") or final_state.get("extraction_errors"):
+                # A resubmission should retry the nodes that fell back, not replay their defaults
+                logger.info(f"Not caching degraded analysis for thread {thread_id}")
+            else:
+                await analysis_cache.set(cache_key, {key: final_state.get(key) for key in CACHED_STATE_KEYS})
+
+        yield StreamResponse(
+            type="complete",
+            content="Analysis completed successfully",
+            checkpoint_id=thread_id,
+            id=event_id(thread_id, "complete", summary_sent, question_sent)
+        )
+    finally:
+        # Stop the graph if the consumer went away or an error ended the stream early
+        if not task.done():
+            task.cancel()
+        keep_lease.cancel()
+        # A stopped or failed run can be continued by the next reconnect, in any worker
+        await release_run_lease(thread_id)
+
+def stream_coalesced_analysis(
+    initial_state: Dict[str, Any],
+    config: Dict[str, Any]
+) -> AsyncGenerator[StreamResponse, None]:
+    """
+    Stream an analysis, attaching to an identical one that is already running.
+
+    Coalesced requests receive the events (and checkpoint ID) of the
+    execution they joined, so the workflow runs once per resume content.
+    When every client has disconnected, STREAM_DISCONNECT_POLICY decides
+    what happens to the execution: "cancel" stops it and its model calls
+    at once, "checkpoint" lets the step in progress finish and be saved,
+    and "continue" runs it to the end. Stopped runs continue from their
+    checkpoint when a client reconnects.
+    """
+    thread_id = config["configurable"]["thread_id"]
+
+    if not Config.SINGLE_FLIGHT_ENABLED:
+        return _run_thread(thread_id, initial_state, config)
+
+    key = analysis_cache_key(initial_state["raw_text"])
+    return analysis_flights.stream(key, lambda: _run_thread(thread_id, initial_state, config))
+
+async def reconnect_analysis(last_event_id: str) -> AsyncGenerator[StreamResponse, None]:
+    """
+    Continue an analysis stream after the event a client last received.
+
+    A run still going in this process is rejoined: the events it produced
+    since are replayed, then followed live. Otherwise the events are
+    rebuilt from the thread's checkpoint, so nothing is generated again.
+    An unfinished run whose lease is free (it was stopped, or the worker
+    running it stopped renewing the lease for STREAM_LEASE_SECONDS) is
+    taken over and continued here from its last checkpoint; one still
+    leased by another worker is followed through its checkpoints instead.
+    A summary that was cut off before it was checkpointed is generated
+    again and streamed from its start.
+    """
+    parsed = parse_event_id(last_event_id)
+    if parsed is None:
+        raise ValueError(f"Invalid Last-Event-ID: {last_event_id}")
+    thread_id, after = parsed
+
+    flight = thread_flights.get(thread_id)
+    if flight is not None:
+        logger.info(f"Rejoining running analysis for thread {thread_id}")
+        async for event in flight.subscribe():
+            if not received(event_position(event), after):
+                yield event
+        return
+
+    config = {"configurable": {"thread_id": thread_id}}
+    while True:
+        snapshot = await resume_workflow.aget_state(config)
+        if not snapshot.values:
+            raise ValueError(f"No checkpoint found for ID: {thread_id}")
+
+        finished = not snapshot.next or bool(snapshot.values.get("error"))
+        for event in checkpoint_events(thread_id, snapshot.values, finished, after):
+            after = advance(after, event_position(event))
+            yield event
+        if finished:
+            return
+
+        if await resume_workflow.checkpointer.acquire_lease(run_lease_name(thread_id), Config.STREAM_LEASE_SECONDS):
+            logger.info(f"Continuing stopped analysis for thread {thread_id} at {', '.join(snapshot.next)}")
+            if not snapshot.values.get("summary"):
+                after = (0, *after[1:])
+            events = _run_thread(thread_id, None, config)
+            async for event in events:
+                if not received(event_position(event), after):
+                    yield event
+            return
+
+        await asyncio.sleep(Config.STREAM_POLL_INTERVAL_SECONDS)
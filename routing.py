@@ -0,0 +1,43 @@
+import re
+import uuid
+from typing import Dict, Optional
+
+from app.utils.config import Config
+
+def _node_name(value: str) -> str:
+    # Dots separate the node from the rest of a thread ID, so they cannot appear in the name
+    return re.sub(r"[^A-Za-z0-9_-]", "-", value.strip())
+
+def parse_node_urls(value: str) -> Dict[str, str]:
+    """`node-a=http://10.0.0.1:8000,node-b=http://10.0.0.2:8000` as a mapping of node to base URL"""
+    urls = {}
+    for item in value.split(","):
+        node, _, url = item.partition("=")
+        if node.strip() and url.strip():
+            urls[_node_name(node)] = url.strip().rstrip("/")
+    return urls
+
+NODE_ID = _node_name(Config.NODE_ID)
+NODE_URLS = parse_node_urls(Config.NODE_URLS)
+
+def new_thread_id() -> str:
+    """Thread ID that names the node holding its checkpoints when NODE_ID is set"""
+    thread_id = f"thread_{uuid.uuid4().hex[:8]}"
+    return f"{thread_id}.{NODE_ID}" if NODE_ID else thread_id
+
+def thread_node(thread_id: str) -> Optional[str]:
+    """Node a thread was started on, or None for IDs without one"""
+    _, dot, node = thread_id.rpartition(".")
+    return node if dot and node else None
+
+def owner_url(thread_id: str, path: str) -> Optional[str]:
+    """
+    URL of `path` on the node that owns a thread, if that is another node.
+
+    Only needed when nodes keep checkpoints locally; with a shared
+    checkpoint backend NODE_URLS is left empty and nothing is routed.
+    """
+    node = thread_node(thread_id)
+    if node is None or node == NODE_ID or node not in NODE_URLS:
+        return None
+    return f"{NODE_URLS[node]}{path}"
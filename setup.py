@@ -6,27 +6,33 @@ setup(
     description="LangGraph-powered resume analysis with streaming and checkpointing",
     packages=find_packages(),
     install_requires=[
-        "fastapi==0.104.1",
-        "uvicorn==0.24.0", 
+        "fastapi==0.143.0",
+        "uvicorn==0.54.0",
         "langgraph==0.0.62",
-        "langchain==0.0.335",
-        "langchain-openai==0.0.2",
-        "pydantic==2.5.0",
+        "langchain==0.2.16",
+        "langchain-core==0.2.43",
+        "langchain-openai==0.1.25",
+        "openai==1.109.1",
+        "httpx==0.28.1",
+        "pydantic==2.14.1",
         "python-multipart==0.0.6",
-        "python-dotenv==1.0.0",
+        "python-dotenv==1.2.4",
         "aiosqlite==0.19.0",
-        "requests==2.31.0"
+        "prometheus-client==0.26.0",
+        "tiktoken==0.14.0",
+        "requests==2.34.2"
     ],
-    python_requires=">=3.8",
+    extras_require={
+        # Offline test suite: pip install -e ".[test]"
+        "test": ["pytest==9.1.1"]
+    },
+    python_requires=">=3.11",
     author="Your Name",
     author_email="your.email@example.com",
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Developers", 
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.8",
-        "Programming Language :: Python :: 3.9",
-        "Programming Language :: Python :: 3.10",
         "Programming Language :: Python :: 3.11",
     ],
 )
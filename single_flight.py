@@ -0,0 +1,101 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, Dict, Generic, List, Optional, Set, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class Flight(Generic[T]):
+    """
+    One in-progress execution whose events are fanned out to every subscriber.
+
+    When the last subscriber leaves before the execution is done, the
+    flight is marked abandoned and on_idle is called; a new subscriber
+    clears the mark.
+    """
+
+    def __init__(self, key: str = "", on_idle: Optional[Callable[["Flight[T]"], None]] = None):
+        self.key = key
+        self.on_idle = on_idle
+        self.events: List[T] = []
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.error: Optional[BaseException] = None
+        self.done = False
+        self.abandoned = False
+        self.task: Optional[asyncio.Task] = None
+
+    def publish(self, event: T) -> None:
+        self.events.append(event)
+        for queue in self.subscribers:
+            queue.put_nowait(event)
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.error = error
+        self.done = True
+        for queue in self.subscribers:
+            queue.put_nowait(None)
+
+    async def subscribe(self) -> AsyncIterator[T]:
+        """Replay the events produced so far, then follow the live ones"""
+        queue: asyncio.Queue = asyncio.Queue()
+        for event in self.events:
+            queue.put_nowait(event)
+        if self.done:
+            queue.put_nowait(None)
+        self.subscribers.add(queue)
+        self.abandoned = False
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    break
+                yield event
+            if self.error is not None:
+                raise self.error
+        finally:
+            self.subscribers.discard(queue)
+            if not self.subscribers and not self.done:
+                self.abandoned = True
+                if self.on_idle is not None:
+                    self.on_idle(self)
+
+class SingleFlight(Generic[T]):
+    """
+    Coalesces concurrent executions that share a key.
+
+    The first caller for a key starts the execution; callers arriving while
+    it is still running attach to it and receive the same events.
+    """
+
+    def __init__(self, on_idle: Optional[Callable[[Flight[T]], None]] = None):
+        self._flights: Dict[str, Flight[T]] = {}
+        self.on_idle = on_idle
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._flights
+
+    def get(self, key: str) -> Optional[Flight[T]]:
+        return self._flights.get(key)
+
+    def stream(self, key: str, factory: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = Flight(key, self.on_idle)
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._run(key, flight, factory))
+        else:
+            logger.info(f"Joining in-flight execution for key {key[:12]}")
+        return flight.subscribe()
+
+    async def _run(self, key: str, flight: Flight[T], factory: Callable[[], AsyncIterator[T]]) -> None:
+        error = None
+        try:
+            async for event in factory():
+                flight.publish(event)
+        except Exception as e:
+            error = e
+        finally:
+            # New callers from here on start a fresh execution (or hit the result cache)
+            self._flights.pop(key, None)
+            flight.finish(error)
@@ -0,0 +1,31 @@
+import asyncio
+import os
+import socket
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import aiosqlite
+
+def process_owner() -> str:
+    """Name of this worker process in leases and job claims shared through a database"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+@asynccontextmanager
+async def immediate_transaction(conn: aiosqlite.Connection, lock: asyncio.Lock) -> AsyncIterator[aiosqlite.Connection]:
+    """
+    Write transaction holding SQLite's write lock from its first statement.
+
+    conn must be in autocommit mode (isolation_level=None). Taking the
+    lock up front (BEGIN IMMEDIATE) means a transaction never starts as a
+    read on a snapshot another process has since changed, which would fail
+    at once instead of waiting out busy_timeout. lock serializes the
+    transactions of this process on the shared connection.
+    """
+    async with lock:
+        await conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            await conn.execute("ROLLBACK")
+            raise
+        await conn.execute("COMMIT")
@@ -0,0 +1,83 @@
+import asyncio
+from typing import Any, AsyncIterator, Optional, Tuple
+
+from app.models.resume_models import StreamResponse
+
+# Event types of one analysis. An event ID is "<thread_id>:<type>:<summary_chars>:<question_sent>":
+# the summary length and whether the first question was sent when the event was. With the first
+# question fast path the question can arrive in the middle of the summary, so positions are
+# cursors of (summary_chars, question_sent, finished) rather than a single order
+EVENT_TYPES = ("summary", "question", "complete", "error")
+FINAL_EVENTS = ("complete", "error")
+
+# Comment line: ignored by clients, but keeps proxies from closing an idle stream
+HEARTBEAT = ": heartbeat\n\n"
+
+Position = Tuple[int, int, int]
+
+# Position of a client that has received nothing yet
+START: Position = (0, 0, 0)
+
+def event_id(thread_id: str, event_type: str, summary_chars: int = 0, question_sent: bool = False) -> str:
+    return f"{thread_id}:{event_type}:{summary_chars}:{int(question_sent)}"
+
+def parse_event_id(value: str) -> Optional[Tuple[str, Position]]:
+    """Thread ID and position of an analysis event ID, or None if it is not one"""
+    thread_id, _, rest = value.strip().partition(":")
+    event_type, _, rest = rest.partition(":")
+    summary_chars, _, question_sent = rest.partition(":")
+    if (
+        not thread_id or event_type not in EVENT_TYPES
+        or not summary_chars.isdigit() or question_sent not in ("0", "1")
+    ):
+        return None
+    return thread_id, (int(summary_chars), int(question_sent), int(event_type in FINAL_EVENTS))
+
+def event_position(event: StreamResponse) -> Position:
+    """Position of an event in its analysis; events without an ID are at the start"""
+    parsed = parse_event_id(event.id) if event.id else None
+    return parsed[1] if parsed else START
+
+def received(position: Position, after: Position) -> bool:
+    """Whether a client at position `after` already has the event at `position`"""
+    return all(p <= a for p, a in zip(position, after))
+
+def advance(after: Position, position: Position) -> Position:
+    """Client position after it receives the event at `position`"""
+    return tuple(max(a, p) for a, p in zip(after, position))
+
+def format_event(event: StreamResponse) -> str:
+    """text/event-stream frame: id (if any), event type and the JSON payload"""
+    frame = f"id: {event.id}\n" if event.id else ""
+    return f"{frame}event: {event.type}\ndata: {event.json()}\n\n"
+
+async def _next(iterator: AsyncIterator[str]) -> Tuple[bool, Any]:
+    try:
+        return True, await iterator.__anext__()
+    except StopAsyncIteration:
+        return False, None
+
+async def with_heartbeats(frames: AsyncIterator[str], interval_seconds: float) -> AsyncIterator[str]:
+    """Pass frames through, adding a heartbeat whenever none was sent for interval_seconds"""
+    iterator = frames.__aiter__()
+    pending: Optional[asyncio.Task] = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.create_task(_next(iterator))
+            done, _ = await asyncio.wait({pending}, timeout=interval_seconds)
+            if not done:
+                yield HEARTBEAT
+                continue
+            task, pending = pending, None
+            more, frame = task.result()
+            if not more:
+                return
+            yield frame
+    finally:
+        # The client went away: stop waiting for the next frame, then close the source
+        if pending is not None:
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple, Type
+
+from langchain.schema import OutputParserException
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from pydantic import BaseModel, ValidationError
+
+from app.nodes.prompts import CHAIN_SPECS, get_chain, get_repair_chain
+from app.utils.config import Config
+from app.utils.metrics import STRUCTURED_REPAIRS
+
+logger = logging.getLogger(__name__)
+
+def tool_arguments(message: BaseMessage) -> Tuple[Optional[Dict[str, Any]], str]:
+    """Arguments of the model's tool call, or None and the raw text to show in a repair request"""
+    tool_calls = getattr(message, "tool_calls", None) or []
+    if tool_calls:
+        return tool_calls[0]["args"], ""
+    invalid = getattr(message, "invalid_tool_calls", None) or []
+    if invalid:
+        return None, invalid[0].get("args") or ""
+
+    # A model that ignored the tool may still have answered with a JSON object
+    content = str(message.content).strip()
+    try:
+        args = json.loads(content)
+    except json.JSONDecodeError:
+        return None, content
+    return (args, "") if isinstance(args, dict) else (None, content)
+
+def _item_model(schema: Type[BaseModel], field_name: str) -> Optional[Type[BaseModel]]:
+    """Model of the entries of a list field (WorkExperience for work_experiences), if it has one"""
+    field = schema.model_fields.get(field_name)
+    args = getattr(field.annotation, "__args__", ()) if field else ()
+    if args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+        return args[0]
+    return None
+
+def _invalid_items(schema: Type[BaseModel], error: ValidationError) -> Optional[Dict[str, Set[int]]]:
+    """List entries the errors point at, or None if an error concerns the object as a whole"""
+    items: Dict[str, Set[int]] = {}
+    for detail in error.errors():
+        loc = detail["loc"]
+        if len(loc) < 3 or not isinstance(loc[1], int) or _item_model(schema, loc[0]) is None:
+            return None
+        items.setdefault(loc[0], set()).add(loc[1])
+    return items
+
+def _format_errors(error: ValidationError, prefix: Tuple = ()) -> str:
+    """Validation messages, with locations relative to the fragment being repaired"""
+    return "\n".join(
+        f"- {'.'.join(str(part) for part in detail['loc'][len(prefix):]) or 'value'}: {detail['msg']}"
+        for detail in error.errors()
+        if tuple(detail["loc"][:len(prefix)]) == prefix
+    )
+
+async def _repair(
+    name: str,
+    schema: Type[BaseModel],
+    fragment: str,
+    errors: str,
+    config: RunnableConfig
+) -> Tuple[Optional[Dict[str, Any]], str]:
+    """Ask the model to correct one fragment; returns its tool arguments like tool_arguments"""
+    message = await get_repair_chain(name, schema).ainvoke(
+        {"schema_name": schema.__name__, "fragment": fragment, "errors": errors},
+        config
+    )
+    return tool_arguments(message)
+
+async def _repair_item(
+    name: str,
+    model: Type[BaseModel],
+    item: Any,
+    errors: str,
+    config: RunnableConfig
+) -> Optional[Dict[str, Any]]:
+    """Repair one invalid list entry, or None once the attempts are used up"""
+    fragment = json.dumps(item, default=str)
+    for _ in range(Config.STRUCTURED_REPAIR_ATTEMPTS):
+        args, raw = await _repair(name, model, fragment, errors, config)
+        if args is None:
+            errors = "- value: not a valid tool call"
+            continue
+        try:
+            return model(**args).dict()
+        except ValidationError as e:
+            fragment, errors = json.dumps(args, default=str), _format_errors(e)
+    return None
+
+async def _repair_items(
+    name: str,
+    schema: Type[BaseModel],
+    args: Dict[str, Any],
+    items: Dict[str, Set[int]],
+    error: ValidationError,
+    config: RunnableConfig
+) -> Tuple[BaseModel, bool]:
+    """
+    Re-ask for the invalid entries only, in parallel, keeping the valid
+    ones as they are. Entries that cannot be repaired are dropped; returns
+    the result and whether any entry was dropped.
+    """
+    repaired = dict(args)
+    dropped = False
+    for field_name, indexes in items.items():
+        model = _item_model(schema, field_name)
+        ordered = sorted(indexes)
+        results = await asyncio.gather(*[
+            _repair_item(name, model, args[field_name][index], _format_errors(error, (field_name, index)), config)
+            for index in ordered
+        ])
+        values: List[Any] = list(args[field_name])
+        for index, result in zip(ordered, results):
+            values[index] = result
+            STRUCTURED_REPAIRS.labels(chain=name, outcome="repaired" if result else "dropped").inc()
+        repaired[field_name] = [value for value in values if value is not None]
+        dropped = dropped or None in results
+        logger.info(f"Repaired {sum(r is not None for r in results)} of {len(results)} invalid {field_name} in {name}")
+    try:
+        return schema(**repaired), dropped
+    except ValidationError as e:
+        raise OutputParserException(f"Invalid {schema.__name__} after repair: {str(e)}")
+
+async def parse_structured(
+    name: str,
+    schema: Type[BaseModel],
+    message: BaseMessage,
+    config: RunnableConfig
+) -> Tuple[BaseModel, bool]:
+    """
+    Validate a tool-call answer into its schema, repairing it if needed.
+
+    Invalid list entries are re-asked one by one; an answer that is
+    invalid as a whole (no tool call, missing or empty fields) is re-asked
+    in full. At most STRUCTURED_REPAIR_ATTEMPTS repair calls are made per
+    fragment before the node falls back to its defaults. Returns the
+    result and whether entries that could not be repaired were dropped
+    from it, which makes the analysis degraded.
+    """
+    args, raw = tool_arguments(message)
+    for attempt in range(Config.STRUCTURED_REPAIR_ATTEMPTS + 1):
+        errors = "- value: not a valid tool call"
+        if args is not None:
+            try:
+                result = schema(**args)
+                if attempt:
+                    STRUCTURED_REPAIRS.labels(chain=name, outcome="repaired").inc()
+                return result, False
+            except ValidationError as e:
+                items = _invalid_items(schema, e)
+                if items is not None:
+                    return await _repair_items(name, schema, args, items, e, config)
+                raw, errors = json.dumps(args, default=str), _format_errors(e)
+
+        if attempt < Config.STRUCTURED_REPAIR_ATTEMPTS:
+            logger.warning(f"Invalid {schema.__name__} from {name}, asking for a repair:\n{errors}")
+            args, raw = await _repair(name, schema, raw, errors, config)
+
+    STRUCTURED_REPAIRS.labels(chain=name, outcome="failed").inc()
+    raise OutputParserException(f"Invalid {schema.__name__} from {name}:\n{errors}")
+
+async def invoke_structured(name: str, inputs: Dict[str, Any], config: RunnableConfig) -> Tuple[BaseModel, bool]:
+    """Invoke a node's chain and return its validated (and if needed repaired) output, as parse_structured"""
+    message = await get_chain(name).ainvoke(inputs, config)
+    return await parse_structured(name, CHAIN_SPECS[name][1], message, config)
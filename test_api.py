@@ -0,0 +1,137 @@
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils.sse import parse_event_id, received
+from app.workflow.resume_graph import create_initial_state, generate_thread_id, resume_workflow
+from app.workflow.resume_stream import stream_resume_analysis
+from test_examples.sample_resumes import SAMPLE_RESUME_1
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+def read_events(response):
+    """(id, type, payload) of each frame of an event stream; heartbeats are skipped"""
+    events = []
+    for frame in response.text.split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.splitlines() if not line.startswith(":"))
+        if fields:
+            events.append((fields.get("id"), fields["event"], json.loads(fields["data"])))
+    return events
+
+def analyze(client, resume_text=SAMPLE_RESUME_1, **headers):
+    response = client.post("/analyze-resume", json={"resume_text": resume_text}, headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    return read_events(response)
+
+def test_analyze_resume_event_sequence(client):
+    events = analyze(client)
+    types = [event_type for _, event_type, _ in events]
+
+    assert types.count("question") == 1
+    assert types[-1] == "complete"
+    assert "summary" in types
+    assert "error" not in types
+
+    summary = "".join(payload["content"] for _, event_type, payload in events if event_type == "summary")
+    assert summary.strip()
+
+    # Every event moves the client forward, so a reconnect never repeats one
+    positions = [parse_event_id(event_id)[1] for event_id, _, _ in events]
+    for earlier, later in zip(positions, positions[1:]):
+        assert not received(later, earlier)
+
+    thread_id = events[-1][2]["checkpoint_id"]
+    assert thread_id and all(event_id.startswith(f"{thread_id}:") for event_id, _, _ in events)
+
+def test_reconnect_after_summary(client):
+    events = analyze(client)
+    last_summary = [event_id for event_id, event_type, _ in events if event_type == "summary"][-1]
+
+    replayed = analyze(client, **{"Last-Event-ID": last_summary})
+    assert [event_type for _, event_type, _ in replayed][-1] == "complete"
+    assert "summary" not in [event_type for _, event_type, _ in replayed]
+
+def test_invalid_last_event_id(client):
+    response = client.post(
+        "/analyze-resume", json={"resume_text": SAMPLE_RESUME_1}, headers={"Last-Event-ID": "nonsense"}
+    )
+    assert response.status_code == 400
+
+def test_resume_questions_uses_caller_insights(client):
+    events = analyze(client)
+    thread_id = events[-1][2]["checkpoint_id"]
+    streamed_question = [payload["content"] for _, event_type, payload in events if event_type == "question"][0]
+    insights = ["Led a team of six engineers", "Migrated services to Kubernetes"]
+
+    response = client.post("/resume-questions", json={"checkpoint_id": thread_id, "insights": insights})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "success"
+    assert body["checkpoint_id"] == thread_id
+    assert body["insights_used"] == insights
+    assert body["questions"]
+    # The first run's fast-path question does not lead the regenerated set
+    assert body["questions"][0] != streamed_question
+
+def test_resume_questions_rejects_unfinished_run(client):
+    response = client.post("/resume-questions", json={"checkpoint_id": stopped_run()})
+    assert response.status_code == 409
+
+def test_resume_questions_rejects_run_leased_elsewhere(client):
+    thread_id = analyze(client)[-1][2]["checkpoint_id"]
+    resume_workflow.checkpointer.leases[f"run:{thread_id}"] = ("other-host:1", time.time() + 60)
+    try:
+        response = client.post("/resume-questions", json={"checkpoint_id": thread_id})
+    finally:
+        del resume_workflow.checkpointer.leases[f"run:{thread_id}"]
+    assert response.status_code == 409
+
+def test_resume_questions_unknown_checkpoint(client):
+    response = client.post("/resume-questions", json={"checkpoint_id": "thread_missing"})
+    assert response.status_code == 404
+
+def stopped_run():
+    """Thread of an analysis stopped at its first checkpoint after the input"""
+    thread_id = generate_thread_id()
+    checkpoints = []
+
+    def should_stop():
+        checkpoints.append(1)
+        return len(checkpoints) >= 3
+
+    async def run():
+        config = {"configurable": {"thread_id": thread_id}}
+        return [event async for event in stream_resume_analysis(create_initial_state(SAMPLE_RESUME_1), config, should_stop)]
+
+    assert asyncio.run(run()) == []
+    return thread_id
+
+def test_reconnect_continues_stopped_run(client):
+    thread_id = stopped_run()
+
+    # The stopped run released its lease, so the reconnect takes it over at once
+    response = client.post(
+        "/analyze-resume", json={"resume_text": SAMPLE_RESUME_1}, headers={"Last-Event-ID": f"{thread_id}:summary:0:0"}
+    )
+    events = read_events(response)
+    assert [event_type for _, event_type, _ in events].count("question") == 1
+    assert events[-1][1] == "complete"
+
+def test_reconnect_waits_for_another_workers_lease(client):
+    thread_id = stopped_run()
+    resume_workflow.checkpointer.leases[f"run:{thread_id}"] = ("other-host:1", time.time() + 1)
+
+    started = time.monotonic()
+    response = client.post(
+        "/analyze-resume", json={"resume_text": SAMPLE_RESUME_1}, headers={"Last-Event-ID": f"{thread_id}:summary:0:0"}
+    )
+    assert read_events(response)[-1][1] == "complete"
+    assert time.monotonic() - started >= 1
@@ -0,0 +1,13 @@
+import asyncio
+
+from app.workflow import batch_analysis
+
+def test_item_without_complete_event_is_an_error(monkeypatch):
+    async def stopped_stream(initial_state, config):
+        return
+        yield
+
+    monkeypatch.setattr(batch_analysis, "stream_coalesced_analysis", stopped_stream)
+    result = asyncio.run(batch_analysis.analyze_one(3, "Jane Doe"))
+    assert result["index"] == 3
+    assert result["status"] == "error"
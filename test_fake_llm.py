@@ -0,0 +1,31 @@
+import asyncio
+
+from langchain_core.messages import HumanMessage
+
+from app.utils.config import Config
+from app.utils.fake_llm import FakeResumeChatModel
+from app.utils.metrics import LLM_TOKENS, llm_metrics_handler
+
+PROMPT = [HumanMessage(content="Summarize this resume")]
+
+def streamed_usage(llm, **kwargs):
+    async def run():
+        message = None
+        async for chunk in llm.astream(PROMPT, **kwargs):
+            message = chunk if message is None else message + chunk
+        return message.usage_metadata
+    return asyncio.run(run())
+
+def test_stream_usage_only_when_asked():
+    llm = FakeResumeChatModel(latency_ms=0, jitter_ms=0, token_delay_ms=0)
+    assert not streamed_usage(llm)
+    assert streamed_usage(llm, stream_usage=True)["output_tokens"] > 0
+
+def test_configured_model_reports_streamed_usage():
+    counted = LLM_TOKENS.labels(chain="usage_test", kind="completion")
+    before = counted._value.get()
+    usage = streamed_usage(
+        Config.get_llm(), config={"callbacks": [llm_metrics_handler], "metadata": {"chain": "usage_test"}}
+    )
+    assert usage["output_tokens"] > 0
+    assert counted._value.get() - before == usage["output_tokens"]
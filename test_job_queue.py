@@ -0,0 +1,18 @@
+import asyncio
+
+from app.workflow.job_queue import JobStore, JobWorkerPool
+
+def test_keep_alive_survives_a_failed_heartbeat(tmp_path):
+    store = JobStore(str(tmp_path / "jobs.db"), stale_seconds=0.03)
+    beats = []
+
+    async def heartbeat(job_id, owner):
+        beats.append(job_id)
+        if len(beats) == 1:
+            raise RuntimeError("database is locked")
+        # Taken over on the third beat: the loop ends
+        return len(beats) < 3
+
+    store.heartbeat = heartbeat
+    asyncio.run(asyncio.wait_for(JobWorkerPool(store, 1)._keep_alive("job_1"), 1))
+    assert beats == ["job_1"] * 3
@@ -0,0 +1,15 @@
+import ast
+from pathlib import Path
+
+ROOT = Path(__file__).parent
+
+def install_requires():
+    for node in ast.walk(ast.parse((ROOT / "setup.py").read_text())):
+        if isinstance(node, ast.keyword) and node.arg == "install_requires":
+            return ast.literal_eval(node.value)
+    raise AssertionError("setup.py has no install_requires")
+
+def test_requirements_match_setup():
+    requirements = (ROOT / "requirements.txt").read_text().split()
+    assert sorted(requirements) == sorted(install_requires())
+    assert all("==" in pin for pin in requirements)
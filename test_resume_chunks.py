@@ -0,0 +1,42 @@
+from app.nodes.resume_chunks import chunk_text, merge_education, merge_skills, merge_work_experiences
+from app.utils.tokenizer import count_tokens
+
+EXPERIENCE = "WORK EXPERIENCE\n\n" + "\n\n".join(
+    f"Engineer {index} | Company {index} | 2010-01 to 2011-01\n"
+    f"- Built system {index} used by many customers across several regions\n"
+    f"- Maintained service {index} and its deployment pipeline"
+    for index in range(8)
+)
+
+def test_short_text_is_one_chunk():
+    assert chunk_text(EXPERIENCE, 0) == [EXPERIENCE]
+    assert chunk_text(EXPERIENCE, 10000) == [EXPERIENCE]
+
+def test_chunks_keep_entries_whole_and_repeat_the_header():
+    chunks = chunk_text(EXPERIENCE, 80)
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.startswith("WORK EXPERIENCE\n")
+        assert count_tokens(chunk) <= 80
+    for index in range(8):
+        holding = [chunk for chunk in chunks if f"Company {index} |" in chunk]
+        assert len(holding) == 1
+        assert f"service {index} and" in holding[0]
+
+def test_merge_work_experiences_keeps_longest_description():
+    merged = merge_work_experiences([
+        {"role": "Engineer", "company": "Acme Corp", "start_date": "2020-01", "end_date": None,
+         "description": "Built things"},
+        {"role": "engineer", "company": "ACME Corp.", "start_date": "2020-01", "end_date": "2022-01",
+         "description": "Built the billing platform"},
+        {"role": "Engineer", "company": "Initech", "start_date": "2018-01", "end_date": "2019-12",
+         "description": "Ported reports"},
+    ])
+    assert len(merged) == 2
+    assert merged[0]["description"] == "Built the billing platform"
+    assert merged[0]["end_date"] == "2022-01"
+
+def test_merge_education_and_skills():
+    entry = {"degree": "BSc", "field": "Physics", "institution": "State University", "start_year": 2010}
+    assert len(merge_education([entry, {**entry, "institution": "State university"}])) == 1
+    assert merge_skills(["Python", "python", "Node.js", "NodeJS", "SQL"]) == ["Python", "Node.js", "SQL"]
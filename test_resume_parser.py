@@ -0,0 +1,70 @@
+from app.nodes.resume_parser import (
+    INFERENCE_PENALTY, normalize_date, parse_education, parse_skills, parse_work_experience
+)
+
+def test_normalize_date():
+    assert normalize_date("2021-1") == ("2021-01", False)
+    assert normalize_date("03/2019") == ("2019-03", False)
+    assert normalize_date("Sept. 2020") == ("2020-09", False)
+    assert normalize_date("present") == ("Present", False)
+    assert normalize_date("2018") == ("2018-01", True)
+    assert normalize_date("last spring") == (None, False)
+
+def test_work_experience_entries_and_bullets():
+    parsed = parse_work_experience(
+        "Senior Engineer | Acme Corp | 2021-01 to Present\n"
+        "- Led the platform team\n"
+        "- Cut deploy time in half\n"
+        "Engineer | Initech | 2018-06 to 2020-12\n"
+        "- Built the billing service"
+    )
+    assert parsed.confidence == 1.0
+    assert [(exp.role, exp.company) for exp in parsed.entries] == [
+        ("Senior Engineer", "Acme Corp"), ("Engineer", "Initech")
+    ]
+    assert parsed.entries[0].start_date == "2021-01"
+    assert parsed.entries[0].end_date == "Present"
+    assert parsed.entries[0].description == "Led the platform team; Cut deploy time in half"
+
+def test_work_experience_inferred_values_lower_confidence():
+    parsed = parse_work_experience("Engineer | Initech | 2018 to 2020")
+    # Two guessed months and a generated description
+    assert parsed.confidence == INFERENCE_PENALTY ** 3
+    assert parsed.entries[0].description == "Engineer at Initech"
+
+def test_work_experience_unknown_layout_is_not_trusted():
+    parsed = parse_work_experience(
+        "Engineer | Initech | 2018-06 to 2020-12\n"
+        "- Built the billing service\n"
+        "Acme Corp, Senior Engineer, since 2021"
+    )
+    assert len(parsed.entries) == 1
+    assert parsed.confidence == 0.5
+    assert parse_work_experience(None).confidence == 0.0
+
+def test_education():
+    parsed = parse_education(
+        "Bachelor of Science in Computer Science | University of Technology | 2014 to 2018\n"
+        "- Graduated Magna Cum Laude\n"
+        "Master of Business Administration | State University | 2019 to 2021"
+    )
+    assert [(edu.degree, edu.field) for edu in parsed.entries] == [
+        ("Bachelor of Science", "Computer Science"),
+        ("Master of Business Administration", "Business Administration")
+    ]
+    assert parsed.entries[0].start_year == 2014
+    assert parsed.confidence == INFERENCE_PENALTY
+
+def test_skills():
+    parsed = parse_skills("- Programming: Python, SQL\n- Tools: Docker; Git, Python.")
+    assert parsed.entries == ["Python", "SQL", "Docker", "Git"]
+    assert parsed.confidence == 1.0
+
+def test_foreign_text_lowers_confidence():
+    # Lines from sections the segmenter did not separate
+    skills = parse_skills("Python, SQL\nLANGUAGES\nEnglish, Spanish\nINTERESTS\nChess, hiking")
+    assert skills.confidence < 0.8
+    experience = parse_work_experience(
+        "Engineer | Acme Corp | 2020-01 to Present\n- Led the platform team\nAWARDS\nEmployee of the Month"
+    )
+    assert experience.confidence == 1 / 3
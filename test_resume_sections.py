@@ -0,0 +1,59 @@
+from app.nodes.resume_parser import parse_skills, parse_work_experience
+from app.nodes.resume_sections import route_text, section_for, segment_resume
+from test_examples.sample_resumes import SAMPLE_RESUME_1
+
+def test_headers():
+    assert section_for("WORK EXPERIENCE") == "experience"
+    assert section_for("Education:") == "education"
+    assert section_for("Technical Skills") == "skills"
+    assert section_for("- Led the platform team") is None
+    assert section_for("CERTIFICATIONS") == "other"
+    assert section_for("IBM") is None
+    assert section_for("Engineer | Acme Corp | 2021-01 to Present") is None
+
+def test_segment_sample_resume():
+    sections = segment_resume(SAMPLE_RESUME_1)
+    assert set(sections) == {"contact", "experience", "education", "skills"}
+    assert sections["contact"].startswith("John Smith")
+    assert "Junior Developer | DevStudio" in sections["experience"]
+    assert "University of Technology" in sections["education"]
+    assert "EDUCATION" not in sections["experience"]
+
+def test_route_text():
+    sections = segment_resume(SAMPLE_RESUME_1)
+    text = route_text(sections, "education", SAMPLE_RESUME_1)
+    assert text.startswith("EDUCATION\n")
+    assert "TechCorp" not in text
+    # Nothing to route: the whole resume is extracted
+    prose = "Jane Doe. Engineer at Acme since 2019."
+    assert route_text(segment_resume(prose), "work_experience", prose) == prose
+
+def test_caps_employer_line_keeps_roles_in_experience():
+    text = (
+        "Jane Doe\n\nEXPERIENCE\n"
+        "Senior Engineer | Acme Corp | 2020-01 to Present\n- Led the platform team\n"
+        "IBM\n"
+        "Software Engineer | IBM | 2016-01 to 2019-12\n- Built release tooling\n\n"
+        "EDUCATION\nBSc in Physics | State University | 2012 to 2016"
+    )
+    sections = segment_resume(text)
+    routed = route_text(sections, "work_experience", text)
+    assert "Software Engineer | IBM | 2016-01 to 2019-12" in routed
+    companies = [exp.company for exp in parse_work_experience(sections["experience"]).entries]
+    assert companies == ["Acme Corp", "IBM"]
+
+def test_caps_skills_block_stays_in_skills():
+    text = "Jane Doe\n\nEXPERIENCE\nEngineer | Acme Corp | 2020-01 to Present\n\nSKILLS\nPYTHON\nAWS, GCP"
+    sections = segment_resume(text)
+    assert parse_skills(sections["skills"]).entries == ["PYTHON", "AWS", "GCP"]
+
+def test_other_headers_end_the_section_above():
+    text = (
+        "Jane Doe\n\nEXPERIENCE\nEngineer | Acme Corp | 2020-01 to Present\n- Led the platform team\n\n"
+        "AWARDS\nEmployee of the Month\nHackathon winner\n\n"
+        "SKILLS\nPython, SQL\n\nLANGUAGES\nEnglish, Spanish\n\nACCOMPLISHMENTS\nChess, hiking"
+    )
+    sections = segment_resume(text)
+    assert set(sections) == {"contact", "experience", "skills"}
+    assert parse_work_experience(sections["experience"]).entries[0].description == "Led the platform team"
+    assert parse_skills(sections["skills"]).entries == ["Python", "SQL"]
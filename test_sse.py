@@ -0,0 +1,30 @@
+from app.models.resume_models import StreamResponse
+from app.utils.sse import START, advance, event_id, event_position, format_event, parse_event_id, received
+
+def test_event_ids_round_trip():
+    assert event_id("thread_1", "summary", 128, True) == "thread_1:summary:128:1"
+    assert parse_event_id("thread_1:summary:128:1") == ("thread_1", (128, 1, 0))
+    assert parse_event_id("thread_1:complete:128:1") == ("thread_1", (128, 1, 1))
+    assert parse_event_id("thread_1:question:0:1") == ("thread_1", (0, 1, 0))
+
+def test_invalid_event_ids():
+    for value in ("", "thread_1", "thread_1:summary:128", "thread_1:token:1:0", "thread_1:summary:x:0",
+                  "thread_1:summary:1:2", ":summary:1:0"):
+        assert parse_event_id(value) is None
+    assert event_position(StreamResponse(type="summary", content="")) == START
+
+def test_question_during_summary():
+    # The fast-path question arrived after 12 summary characters
+    question = (12, 1, 0)
+    assert not received((40, 1, 0), question)
+    assert received((12, 0, 0), question)
+    assert not received(question, (40, 0, 0))
+    assert advance((40, 0, 0), question) == (40, 1, 0)
+    assert received((12, 1, 0), advance((40, 0, 0), question))
+
+def test_format_event():
+    event = StreamResponse(type="question", content="Why?", id="thread_1:question:0:1")
+    frame = format_event(event)
+    assert frame.startswith("id: thread_1:question:0:1\nevent: question\ndata: {")
+    assert frame.endswith("\n\n")
+    assert '"id"' not in frame
@@ -0,0 +1,27 @@
+import asyncio
+
+from langchain_core.messages import AIMessage
+
+from app.models.resume_models import WorkExperienceList
+from app.nodes.structured_output import parse_structured
+from app.utils.config import Config
+
+VALID = {"company": "Acme Corp", "role": "Engineer", "start_date": "2020-01", "end_date": "Present",
+         "description": "Led the platform team"}
+
+def answer(args):
+    return AIMessage(content="", tool_calls=[{"name": "WorkExperienceList", "args": args, "id": "call_1"}])
+
+def parse(message):
+    return asyncio.run(parse_structured("work_experience", WorkExperienceList, message, {}))
+
+def test_valid_answer_is_not_degraded():
+    result, degraded = parse(answer({"work_experiences": [VALID]}))
+    assert len(result.work_experiences) == 1 and not degraded
+
+def test_dropped_entry_marks_result_degraded(monkeypatch):
+    # No repair attempts: the invalid entry is dropped at once
+    monkeypatch.setattr(Config, "STRUCTURED_REPAIR_ATTEMPTS", 0)
+    result, degraded = parse(answer({"work_experiences": [VALID, {**VALID, "start_date": "last spring"}]}))
+    assert [exp.company for exp in result.work_experiences] == ["Acme Corp"]
+    assert degraded
@@ -1,267 +1,343 @@
-import json
+import asyncio
 import logging
-from typing import Dict, Any
-from langchain.prompts import PromptTemplate
-from langchain.output_parsers import PydanticOutputParser
+import time
+from functools import lru_cache, wraps
+from typing import Dict, Any, List, Tuple
 from langchain.schema import OutputParserException
+from langchain_core.runnables import RunnableConfig
 
-from app.models.resume_models import (
-    WorkExperienceList, EducationList, ResumeInsights, 
-    InterviewQuestions, GraphState
-)
+from app.nodes.prompts import CHAIN_SPECS, get_chain
+from app.nodes.resume_chunks import chunk_text, merge_education, merge_skills, merge_work_experiences
+from app.nodes.resume_parser import ParsedSection, parse_education, parse_skills, parse_work_experience
+from app.nodes.resume_sections import route_text, segment_resume
+from app.nodes.structured_output import invoke_structured
 from app.utils.config import Config
+from app.utils.metrics import (
+    EXTRACTION_CHUNKS, FAST_PATH_RESULTS, NODE_DURATION, NODE_ERRORS, NODE_FALLBACKS, record_parser_fallback
+)
+from app.utils.result_cache import node_cache, node_cache_key
+from app.utils.tokenizer import truncate_to_tokens
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+async def invoke_chain(name: str, inputs: Dict[str, Any], config: RunnableConfig) -> Tuple[Any, bool]:
+    """
+    Invoke a prebuilt structured chain, reusing the cached result for identical prompt inputs.
+    
+    Returns the result and whether entries were dropped from it in repair;
+    such a result is not cached.
+    """
+    if not Config.RESULT_CACHE_ENABLED:
+        return await invoke_structured(name, inputs, config)
+    
+    key = node_cache_key(name, inputs)
+    cached = await node_cache.get(key)
+    if cached is not None:
+        logger.info(f"Node cache hit for {name}")
+        return CHAIN_SPECS[name][1](**cached), False
+    
+    result, degraded = await invoke_structured(name, inputs, config)
+    if not degraded:
+        await node_cache.set(key, result.dict())
+    return result, degraded
+
+async def invoke_chunked(name: str, node: str, text: str, config: RunnableConfig) -> Tuple[List[Any], bool]:
+    """
+    Map step of chunked extraction: invoke a chain on every chunk of text in parallel.
+    
+    Text within EXTRACTION_CHUNK_TOKENS is a single chunk. A chunk whose
+    output cannot be parsed is dropped; the node only falls back to
+    defaults when no chunk could be parsed. Returns the parsed results
+    and whether any chunk, or any entry of a chunk, was dropped.
+    """
+    chunks = chunk_text(text, Config.EXTRACTION_CHUNK_TOKENS)
+    EXTRACTION_CHUNKS.labels(node=node).observe(len(chunks))
+    if len(chunks) > 1:
+        logger.info(f"Extracting {name} from {len(chunks)} chunks")
+    
+    results = await asyncio.gather(
+        *[invoke_chain(name, {"resume_text": chunk}, config) for chunk in chunks],
+        return_exceptions=True
+    )
+    answered = [result for result in results if not isinstance(result, BaseException)]
+    parsed = [result for result, _ in answered]
+    for result in results:
+        if isinstance(result, OutputParserException) and parsed:
+            logger.warning(f"Parser error in one of {len(chunks)} {name} chunks: {result}")
+            record_parser_fallback(node)
+        elif isinstance(result, BaseException):
+            raise result
+    return parsed, len(parsed) < len(chunks) or any(dropped for _, dropped in answered)
+
+@lru_cache(maxsize=256)
+def _segment(raw_text: str) -> Dict[str, str]:
+    return segment_resume(raw_text)
+
+def get_sections(state: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Sections of the resume, derived from raw_text rather than stored in
+    state so checkpoints do not hold the resume twice.
+    
+    Memoized: the parallel nodes of one run segment the resume once.
+    The returned dict is shared and must not be modified.
+    """
+    return _segment(state["raw_text"])
+
+def routed_text(state: Dict[str, Any], chain_name: str) -> str:
+    """The part of the resume a chain needs, or the whole resume if it has no recognizable sections"""
+    return route_text(get_sections(state), chain_name, state["raw_text"])
+
+def fast_path(section: str, parsed: ParsedSection) -> bool:
+    """Whether a rule-based parse is trusted enough to skip the LLM call"""
+    trusted = Config.FAST_PATH_ENABLED and parsed.confidence >= Config.FAST_PATH_MIN_CONFIDENCE
+    FAST_PATH_RESULTS.labels(section=section, outcome="parsed" if trusted else "llm").inc()
+    return trusted
+
 def safe_llm_call(func):
     """Decorator for safe LLM calls with error handling"""
-    def wrapper(state: Dict[str, Any]) -> Dict[str, Any]:
+    @wraps(func)
+    async def wrapper(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+        started = time.perf_counter()
         try:
-            return func(state)
+            return await func(state, config)
         except Exception as e:
             logger.error(f"Error in {func.__name__}: {str(e)}")
-            state["error"] = f"Error in {func.__name__}: {str(e)}"
-            return state
+            NODE_ERRORS.labels(node=func.__name__).inc()
+            return {"error": f"Error in {func.__name__}: {str(e)}"}
+        finally:
+            NODE_DURATION.labels(node=func.__name__).observe(time.perf_counter() - started)
     return wrapper
 
-@safe_llm_call
-def extract_work_experience(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Extract work experience from resume text"""
-    logger.info("Extracting work experience")
-    
-    llm = Config.get_llm()
-    parser = PydanticOutputParser(pydantic_object=WorkExperienceList)
+def safe_extraction(*output_keys: str):
+    """
+    Decorator for extraction nodes that run in parallel branches.
     
-    prompt = PromptTemplate(
-        template="""
-Extract work experience information from the resume text below. Be precise and accurate.
-
-Resume Text:
-{resume_text}
-
-Instructions:
-- Extract company names, job titles, dates, and descriptions
-- Use YYYY-MM format for dates, or "Present" for current positions
-- If no work experience found, return empty list
-- Be thorough but accurate
+    Failures are recorded in extraction_errors instead of aborting the
+    workflow, so the results of the other branch can still be used.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+            started = time.perf_counter()
+            try:
+                return await func(state, config)
+            except Exception as e:
+                logger.error(f"Error in {func.__name__}: {str(e)}")
+                NODE_ERRORS.labels(node=func.__name__).inc()
+                NODE_FALLBACKS.labels(node=func.__name__).inc()
+                update: Dict[str, Any] = {key: [] for key in output_keys}
+                update["extraction_errors"] = [f"Error in {func.__name__}: {str(e)}"]
+                update["degraded"] = True
+                return update
+            finally:
+                NODE_DURATION.labels(node=func.__name__).observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
 
-{format_instructions}
-        """,
-        input_variables=["resume_text"],
-        partial_variables={"format_instructions": parser.get_format_instructions()}
-    )
+@safe_extraction("work_experiences")
+async def extract_work_experience(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+    """Extract work experience from resume text (returns only its own key)"""
+    logger.info("Extracting work experience")
+    
+    parsed = parse_work_experience(get_sections(state).get("experience"))
+    if fast_path("work_experience", parsed):
+        logger.info(f"Parsed {len(parsed.entries)} work experiences without the LLM")
+        return {"work_experiences": [exp.dict() for exp in parsed.entries]}
     
     try:
-        chain = prompt | llm | parser
-        result = chain.invoke({"resume_text": state["raw_text"]})
-        state["work_experiences"] = [exp.dict() for exp in result.work_experiences]
-        state["current_node"] = "extract_work"
-        logger.info(f"Extracted {len(result.work_experiences)} work experiences")
+        results, partial = await invoke_chunked("work_experience", "extract_work_experience", routed_text(state, "work_experience"), config)
+        experiences = merge_work_experiences(exp.dict() for result in results for exp in result.work_experiences)
+        logger.info(f"Extracted {len(experiences)} work experiences")
+        return {"work_experiences": experiences, "degraded": partial}
     except OutputParserException as e:
         logger.warning(f"Parser error in work experience extraction: {e}")
-        state["work_experiences"] = []
-    
-    return state
+        record_parser_fallback("extract_work_experience")
+        return {"work_experiences": [], "degraded": True}
 
-@safe_llm_call
-def extract_education(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Extract education information from resume text"""
+@safe_extraction("education")
+async def extract_education(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+    """Extract education information from resume text (returns only its own key)"""
     logger.info("Extracting education")
     
-    llm = Config.get_llm()
-    parser = PydanticOutputParser(pydantic_object=EducationList)
-    
-    prompt = PromptTemplate(
-        template="""
-Extract education information from the resume text below.
-
-Resume Text:
-{resume_text}
-
-Instructions:
-- Extract institution names, degrees, fields of study, and years
-- Use 4-digit years (e.g., 2020)
-- If no education found, return empty list
-- Be accurate with degree types and field names
-
-{format_instructions}
-        """,
-        input_variables=["resume_text"],
-        partial_variables={"format_instructions": parser.get_format_instructions()}
-    )
+    parsed = parse_education(get_sections(state).get("education"))
+    if fast_path("education", parsed):
+        logger.info(f"Parsed {len(parsed.entries)} education entries without the LLM")
+        return {"education": [edu.dict() for edu in parsed.entries]}
     
     try:
-        chain = prompt | llm | parser
-        result = chain.invoke({"resume_text": state["raw_text"]})
-        state["education"] = [edu.dict() for edu in result.education]
-        state["current_node"] = "extract_education"
-        logger.info(f"Extracted {len(result.education)} education entries")
+        results, partial = await invoke_chunked("education", "extract_education", routed_text(state, "education"), config)
+        education = merge_education(edu.dict() for result in results for edu in result.education)
+        logger.info(f"Extracted {len(education)} education entries")
+        return {"education": education, "degraded": partial}
     except OutputParserException as e:
         logger.warning(f"Parser error in education extraction: {e}")
-        state["education"] = []
-    
-    return state
+        record_parser_fallback("extract_education")
+        return {"education": [], "degraded": True}
 
-@safe_llm_call
-def generate_summary(state: Dict[str, Any]) -> Dict[str, Any]:
-    """Generate professional resume summary"""
-    logger.info("Generating summary")
+@safe_extraction("work_experiences", "education", "skills")
+async def extract_resume_data(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+    """Extract work experience, education and skills with a single LLM call"""
+    logger.info("Extracting work experience, education and skills (combined)")
     
-    llm = Config.get_llm()
+    # The single call covers all three sections, so it is only skipped when every one parses
+    sections = get_sections(state)
+    work, education, skills = (
+        parse_work_experience(sections.get("experience")),
+        parse_education(sections.get("education")),
+        parse_skills(sections.get("skills"))
+    )
+    if all([fast_path("work_experience", work), fast_path("education", education), fast_path("skills", skills)]):
+        logger.info("Parsed work experience, education and skills without the LLM")
+        return {
+            "work_experiences": [exp.dict() for exp in work.entries],
+            "education": [edu.dict() for edu in education.entries],
+            "skills": skills.entries
+        }
     
-    # Format extracted data
-    work_text = ""
-    if state["work_experiences"]:
-        work_text = "\n".join([
-            f"- {exp['role']} at {exp['company']} ({exp.get('start_date', 'N/A')} to {exp.get('end_date', 'N/A')})"
-            for exp in state["work_experiences"]
-        ])
+    try:
+        results, partial = await invoke_chunked("resume_extraction", "extract_resume_data", routed_text(state, "resume_extraction"), config)
+        experiences = merge_work_experiences(exp.dict() for result in results for exp in result.work_experiences)
+        education = merge_education(edu.dict() for result in results for edu in result.education)
+        skills = merge_skills(skill for result in results for skill in result.skills)
+        logger.info(
+            f"Extracted {len(experiences)} work experiences, "
+            f"{len(education)} education entries and {len(skills)} skills"
+        )
+        return {"work_experiences": experiences, "education": education, "skills": skills, "degraded": partial}
+    except OutputParserException as e:
+        logger.warning(f"Parser error in combined extraction: {e}")
+        record_parser_fallback("extract_resume_data")
+        return {"work_experiences": [], "education": [], "skills": [], "degraded": True}
+
+async def merge_extractions(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Join the parallel extraction branches before summary generation"""
+    failures = state.get("extraction_errors") or []
+    update: Dict[str, Any] = {"current_node": "merge_extractions"}
     
-    education_text = ""
-    if state["education"]:
-        education_text = "\n".join([
-            f"- {edu['degree']} in {edu['field']} from {edu['institution']} ({edu['start_year']}-{edu['end_year']})"
-            for edu in state["education"]
-        ])
+    if failures and not state.get("work_experiences") and not state.get("education"):
+        # Nothing usable was extracted, so there is nothing to summarize
+        update["error"] = "; ".join(failures)
+    elif failures:
+        logger.warning(f"Continuing with partial extraction results: {'; '.join(failures)}")
     
-    prompt = PromptTemplate(
-        template="""
-Create a professional resume summary based on the structured data below.
+    return update
 
-Work Experience:
-{work_experience}
+def format_work_experience(state: Dict[str, Any]) -> str:
+    """Extracted work experience as prompt lines, one role per line"""
+    return "\n".join([
+        f"- {exp['role']} at {exp['company']} ({exp.get('start_date', 'N/A')} to {exp.get('end_date', 'N/A')})"
+        for exp in state.get("work_experiences") or []
+    ])
 
-Education:
-{education}
+def format_education(state: Dict[str, Any]) -> str:
+    """Extracted education as prompt lines, one entry per line"""
+    return "\n".join([
+        f"- {edu['degree']} in {edu['field']} from {edu['institution']} ({edu['start_year']}-{edu['end_year']})"
+        for edu in state.get("education") or []
+    ])
 
-Original Resume Text (for context):
-{resume_text}
-
-Instructions:
-- Write a concise, professional summary (2-3 paragraphs)
-- Highlight key qualifications, skills, and achievements
-- Make it compelling for recruiters
-- Focus on career progression and notable accomplishments
-- If data is limited, work with what's available
-        """,
-        input_variables=["work_experience", "education", "resume_text"]
-    )
+@safe_llm_call
+async def generate_summary(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+    """Generate professional resume summary, streaming tokens as they arrive"""
+    logger.info("Generating summary")
     
-    result = llm.invoke(prompt.format(
-        work_experience=work_text or "No work experience data extracted",
-        education=education_text or "No education data extracted",
-        resume_text=state["raw_text"][:1000]  # Limit context
-    ))
+    work_text = format_work_experience(state)
+    education_text = format_education(state)
+    
+    # Tokens reach the client through the run's callbacks; keep the full text for state
+    chunks = []
+    async for chunk in get_chain("summary").astream({
+        "work_experience": work_text or "No work experience data extracted",
+        "education": education_text or "No education data extracted",
+        # Contact line, profile, experience and skills, cut to a token budget at a line break
+        "resume_text": truncate_to_tokens(routed_text(state, "summary"), Config.SUMMARY_CONTEXT_TOKENS)
+    }, config=config):
+        chunks.append(chunk.content)
     
-    state["summary"] = result.content
-    state["current_node"] = "generate_summary"
     logger.info("Summary generated successfully")
     
-    return state
+    return {"summary": "".join(chunks), "current_node": "generate_summary"}
 
 @safe_llm_call
-def extract_insights(state: Dict[str, Any]) -> Dict[str, Any]:
+async def extract_insights(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
     """Extract key insights from resume data"""
     logger.info("Extracting insights")
     
-    llm = Config.get_llm()
-    parser = PydanticOutputParser(pydantic_object=ResumeInsights)
-    
-    prompt = PromptTemplate(
-        template="""
-Extract key professional insights from the resume data below.
-
-Summary: {summary}
-
-Work Experience: {work_experience}
-
-Education: {education}
-
-Instructions:
-- Identify years of experience in specific areas
-- Note leadership roles and team management experience
-- Highlight technical skills and expertise
-- Mention educational background and certifications
-- Point out career progression and achievements
-- Focus on quantifiable and notable aspects
-
-{format_instructions}
-        """,
-        input_variables=["summary", "work_experience", "education"],
-        partial_variables={"format_instructions": parser.get_format_instructions()}
-    )
-    
     work_summary = "; ".join([f"{exp['role']} at {exp['company']}" for exp in state["work_experiences"]])
     edu_summary = "; ".join([f"{edu['degree']} in {edu['field']}" for edu in state["education"]])
     
     try:
-        chain = prompt | llm | parser
-        result = chain.invoke({
+        result, degraded = await invoke_chain("insights", {
             "summary": state.get("summary", ""),
             "work_experience": work_summary or "No work experience",
             "education": edu_summary or "No education data"
-        })
-        state["insights"] = result.insights
-        state["current_node"] = "extract_insights"
+        }, config)
         logger.info(f"Extracted {len(result.insights)} insights")
+        return {"insights": result.insights, "current_node": "extract_insights", "degraded": degraded}
     except OutputParserException as e:
         logger.warning(f"Parser error in insights extraction: {e}")
-        state["insights"] = ["Unable to extract detailed insights"]
-    
-    return state
+        record_parser_fallback("extract_insights")
+        return {"insights": ["Unable to extract detailed insights"], "degraded": True}
 
 @safe_llm_call
-def generate_questions(state: Dict[str, Any]) -> Dict[str, Any]:
+async def generate_questions(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
     """Generate tailored interview questions"""
     logger.info("Generating interview questions")
     
-    llm = Config.get_llm()
-    parser = PydanticOutputParser(pydantic_object=InterviewQuestions)
-    
     insights_text = "\n".join([f"- {insight}" for insight in state["insights"]])
     
-    prompt = PromptTemplate(
-        template="""
-Generate tailored interview questions based on the resume insights below.
-
-Resume Insights:
-{insights}
-
-Instructions:
-- Create 5-7 specific, thoughtful interview questions
-- Mix behavioral, technical, and situational questions
-- Target the candidate's specific experience and skills
-- Include questions about leadership, problem-solving, and technical expertise
-- Make questions open-ended and insightful
-- Avoid generic questions
-
-{format_instructions}
-        """,
-        input_variables=["insights"],
-        partial_variables={"format_instructions": parser.get_format_instructions()}
-    )
-    
     try:
-        chain = prompt | llm | parser
-        result = chain.invoke({"insights": insights_text})
-        state["questions"] = result.questions
-        state["current_node"] = "generate_questions"
+        result, degraded = await invoke_chain("questions", {"insights": insights_text}, config)
         logger.info(f"Generated {len(result.questions)} interview questions")
+        return {"questions": result.questions, "current_node": "generate_questions", "degraded": degraded}
     except OutputParserException as e:
         logger.warning(f"Parser error in question generation: {e}")
-        state["questions"] = ["Tell me about your professional background and key achievements."]
+        record_parser_fallback("generate_questions")
+        return {"questions": ["Tell me about your professional background and key achievements."], "degraded": True}
+
+async def generate_first_question(state: Dict[str, Any], config: RunnableConfig) -> Dict[str, Any]:
+    """
+    Fast path: one interview question straight from the extracted data,
+    generated alongside the summary so it can be streamed before the
+    full question set.
+    
+    Optional, so a failure does not set error: the analysis goes on and
+    the first question of the full set is used instead.
+    """
+    logger.info("Generating first interview question")
+    started = time.perf_counter()
     
-    return state
+    try:
+        result, degraded = await invoke_chain("first_question", {
+            "work_experience": format_work_experience(state) or "No work experience data extracted",
+            "education": format_education(state) or "No education data extracted",
+            "skills": ", ".join(state.get("skills") or []) or "No skills data extracted"
+        }, config)
+        logger.info("First interview question generated")
+        # No current_node: this runs in the same step as generate_summary, which writes it
+        return {"first_question": result.question, "degraded": degraded}
+    except Exception as e:
+        logger.warning(f"First question fast path failed, using the full question set: {str(e)}")
+        NODE_ERRORS.labels(node="generate_first_question").inc()
+        NODE_FALLBACKS.labels(node="generate_first_question").inc()
+        return {"first_question": "", "degraded": True}
+    finally:
+        NODE_DURATION.labels(node="generate_first_question").observe(time.perf_counter() - started)
 
-def start_node(state: Dict[str, Any]) -> Dict[str, Any]:
+async def start_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """Initialize the workflow"""
-    state["current_node"] = "start"
     logger.info("Workflow started")
-    return state
+    return {"current_node": "start"}
 
-def end_node(state: Dict[str, Any]) -> Dict[str, Any]:
+async def end_node(state: Dict[str, Any]) -> Dict[str, Any]:
     """Finalize the workflow"""
-    state["current_node"] = "end"
     logger.info("Workflow completed")
-    return state
\ No newline at end of file
+    update: Dict[str, Any] = {"current_node": "end"}
+    
+    # The question already streamed by the fast path leads the full set
+    first_question = state.get("first_question")
+    if first_question and state.get("questions"):
+        update["questions"] = [first_question] + [q for q in state["questions"] if q != first_question]
+    
+    return update
\ No newline at end of file